@@ -3,7 +3,12 @@ TradeSense API - Flask Backend
 AI-Powered Prop Trading Platform
 """
 
+import importlib
 import os
+import time
+
+_imports_started = time.perf_counter()
+
 from datetime import timedelta
 from flask import Flask, jsonify
 from flask_cors import CORS
@@ -11,6 +16,9 @@ from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from dotenv import load_dotenv
+from services.startup_timer import StartupTimer
+
+_imports_ms = (time.perf_counter() - _imports_started) * 1000
 
 # Load environment variables
 load_dotenv()
@@ -23,6 +31,9 @@ jwt = JWTManager()
 
 def create_app(config_name=None):
     """Application factory pattern"""
+    timer = StartupTimer(started=_imports_started)
+    timer.add('import flask + extensions', _imports_ms)
+
     app = Flask(__name__)
 
     # Configuration
@@ -40,11 +51,33 @@ def create_app(config_name=None):
     app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-change-in-production')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    # EventSource cannot send headers, so /api/trading/stream takes ?token=
+    app.config['JWT_QUERY_STRING_NAME'] = 'token'
+
+    # Background scheduler (price refresh, AI signals, daily reset)
+    # The daily reset time (DAILY_RESET_HOUR / DAILY_RESET_MARKET) is read by ChallengeEngine
+    app.config['SCHEDULER_ENABLED'] = os.environ.get('ENABLE_SCHEDULER', 'false').lower() == 'true'
+    app.config['PRICE_REFRESH_SECONDS'] = int(os.environ.get('PRICE_REFRESH_SECONDS', 30))
+    # Symbols nobody holds or watches are refreshed at this slower rate
+    app.config['PRICE_IDLE_REFRESH_SECONDS'] = int(os.environ.get('PRICE_IDLE_REFRESH_SECONDS', 300))
+    app.config['SIGNAL_REFRESH_SECONDS'] = int(os.environ.get('SIGNAL_REFRESH_SECONDS', 300))
+    # Equity snapshots are folded into minute / hour / day buckets this often
+    app.config['EQUITY_COMPACT_SECONDS'] = int(os.environ.get('EQUITY_COMPACT_SECONDS', 600))
+
+    # Server-Sent Events stream (/api/trading/stream)
+    app.config['STREAM_KEEPALIVE_SECONDS'] = int(os.environ.get('STREAM_KEEPALIVE_SECONDS', 15))
+    app.config['STREAM_MAX_SECONDS'] = int(os.environ.get('STREAM_MAX_SECONDS', 300))
+    app.config['STREAM_PUMP_SECONDS'] = int(os.environ.get('STREAM_PUMP_SECONDS', 2))
+    app.config['STREAM_MAX_PER_WORKER'] = int(os.environ.get('STREAM_MAX_PER_WORKER', 12))
+
+    # Print the per-step boot timing report
+    app.config['STARTUP_TIMING'] = os.environ.get('STARTUP_TIMING', 'false').lower() == 'true'
 
     # Initialize extensions with app
-    db.init_app(app)
-    migrate.init_app(app, db)
-    jwt.init_app(app)
+    with timer.step('init extensions'):
+        db.init_app(app)
+        migrate.init_app(app, db)
+        jwt.init_app(app)
 
     # CORS configuration - Allow Vercel frontend
     frontend_url = os.environ.get('FRONTEND_URL', 'http://localhost:5173')
@@ -62,20 +95,21 @@ def create_app(config_name=None):
         }
     })
 
-    # Register blueprints
-    from routes.auth import auth_bp
-    from routes.challenges import challenges_bp
-    from routes.trading import trading_bp
-    from routes.payment import payment_bp
-    from routes.leaderboard import leaderboard_bp
-    from routes.admin import admin_bp
-
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(challenges_bp, url_prefix='/api/challenges')
-    app.register_blueprint(trading_bp, url_prefix='/api/trading')
-    app.register_blueprint(payment_bp, url_prefix='/api/payment')
-    app.register_blueprint(leaderboard_bp, url_prefix='/api/leaderboard')
-    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    # Register blueprints (module, blueprint, url prefix), timing each step
+    blueprints = [
+        ('routes.auth', 'auth_bp', '/api/auth'),
+        ('routes.challenges', 'challenges_bp', '/api/challenges'),
+        ('routes.trading', 'trading_bp', '/api/trading'),
+        ('routes.payment', 'payment_bp', '/api/payment'),
+        ('routes.leaderboard', 'leaderboard_bp', '/api/leaderboard'),
+        ('routes.admin', 'admin_bp', '/api/admin'),
+    ]
+
+    for module_name, blueprint_name, url_prefix in blueprints:
+        with timer.step(f'import {module_name}'):
+            module = importlib.import_module(module_name)
+        with timer.step(f'register {blueprint_name}'):
+            app.register_blueprint(getattr(module, blueprint_name), url_prefix=url_prefix)
 
     # Health check endpoint
     @app.route('/api/health')
@@ -87,8 +121,20 @@ def create_app(config_name=None):
         })
 
     # Create database tables
-    with app.app_context():
-        db.create_all()
+    with timer.step('db.create_all'):
+        with app.app_context():
+            db.create_all()
+
+    # Start periodic jobs (every worker runs one, the DB lease picks who executes)
+    if app.config['SCHEDULER_ENABLED']:
+        with timer.step('start scheduler'):
+            from services.scheduler import start_scheduler
+            start_scheduler(app)
+
+    timer.finish()
+    app.extensions['startup_timer'] = timer
+    if app.config['STARTUP_TIMING']:
+        print(timer.format())
 
     return app
 
@@ -23,6 +23,8 @@ CREATE TABLE IF NOT EXISTS user_challenges (
     current_balance DECIMAL(12, 2) NOT NULL,
     equity DECIMAL(12, 2) NOT NULL,
     daily_pnl DECIMAL(12, 2) DEFAULT 0,
+    daily_trade_count INTEGER DEFAULT 0,
+    pnl_day DATE,
     total_pnl DECIMAL(12, 2) DEFAULT 0,
     daily_high_equity DECIMAL(12, 2),
     status VARCHAR(20) DEFAULT 'active' CHECK (status IN ('active', 'passed', 'failed')),
@@ -50,6 +52,29 @@ CREATE TABLE IF NOT EXISTS trades (
     closed_at TIMESTAMP
 );
 
+-- Daily P&L Rollup Table (realized P&L and trade count per challenge per day)
+CREATE TABLE IF NOT EXISTS challenge_daily_pnl (
+    id SERIAL PRIMARY KEY,
+    challenge_id INTEGER REFERENCES user_challenges(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    realized_pnl DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    trade_count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_challenge_daily_pnl_day UNIQUE (challenge_id, day)
+);
+
+-- Equity Snapshots Table (raw points compacted into minute / hour / day buckets)
+CREATE TABLE IF NOT EXISTS equity_snapshots (
+    id SERIAL PRIMARY KEY,
+    challenge_id INTEGER REFERENCES user_challenges(id) ON DELETE CASCADE,
+    resolution VARCHAR(10) NOT NULL DEFAULT 'raw' CHECK (resolution IN ('raw', 'minute', 'hour', 'day')),
+    bucket_at TIMESTAMP NOT NULL,
+    open_equity DECIMAL(12, 2) NOT NULL,
+    high_equity DECIMAL(12, 2) NOT NULL,
+    low_equity DECIMAL(12, 2) NOT NULL,
+    close_equity DECIMAL(12, 2) NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 1
+);
+
 -- Positions Table
 CREATE TABLE IF NOT EXISTS positions (
     id SERIAL PRIMARY KEY,
@@ -65,6 +90,25 @@ CREATE TABLE IF NOT EXISTS positions (
     opened_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Pending Orders Table (limit / stop-loss / take-profit, filled on price ticks)
+CREATE TABLE IF NOT EXISTS pending_orders (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    challenge_id INTEGER REFERENCES user_challenges(id) ON DELETE CASCADE,
+    symbol VARCHAR(20) NOT NULL,
+    market VARCHAR(20) NOT NULL,
+    side VARCHAR(10) NOT NULL CHECK (side IN ('buy', 'sell')),
+    order_type VARCHAR(20) NOT NULL CHECK (order_type IN ('limit', 'stop_loss', 'take_profit')),
+    quantity DECIMAL(18, 8) NOT NULL,
+    trigger_price DECIMAL(18, 8) NOT NULL,
+    status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'filled', 'cancelled', 'rejected')),
+    reason VARCHAR(200),
+    filled_price DECIMAL(18, 8),
+    trade_id INTEGER REFERENCES trades(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    closed_at TIMESTAMP
+);
+
 -- Market Data Cache Table
 CREATE TABLE IF NOT EXISTS market_data (
     id SERIAL PRIMARY KEY,
@@ -76,7 +120,17 @@ CREATE TABLE IF NOT EXISTS market_data (
     low_price DECIMAL(18, 8),
     change_percent DECIMAL(8, 4),
     volume DECIMAL(20, 2),
-    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    version BIGINT NOT NULL DEFAULT 0
+);
+
+-- Symbol Demand Table (last quote / chart request per symbol)
+CREATE TABLE IF NOT EXISTS symbol_demand (
+    id SERIAL PRIMARY KEY,
+    symbol VARCHAR(20) UNIQUE NOT NULL,
+    market VARCHAR(20) NOT NULL,
+    source VARCHAR(20),
+    last_requested_at TIMESTAMP NOT NULL
 );
 
 -- AI Signals Table
@@ -100,16 +154,51 @@ CREATE TABLE IF NOT EXISTS admin_settings (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Scheduled Jobs Table (background job leases and run stats)
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(50) UNIQUE NOT NULL,
+    locked_by VARCHAR(100),
+    locked_until TIMESTAMP,
+    last_started_at TIMESTAMP,
+    last_finished_at TIMESTAMP,
+    last_duration_ms INTEGER,
+    last_status VARCHAR(20),
+    last_error TEXT,
+    run_count INTEGER DEFAULT 0,
+    error_count INTEGER DEFAULT 0,
+    total_duration_ms BIGINT DEFAULT 0
+);
+
 -- Indexes for Performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
 CREATE INDEX IF NOT EXISTS idx_trades_user_id ON trades(user_id);
 CREATE INDEX IF NOT EXISTS idx_trades_challenge_id ON trades(challenge_id);
+-- Trade history keyset pagination over (executed_at, id)
+CREATE INDEX IF NOT EXISTS idx_trades_user_executed ON trades(user_id, executed_at, id);
+CREATE INDEX IF NOT EXISTS idx_trades_user_symbol_executed ON trades(user_id, symbol, executed_at, id);
+CREATE INDEX IF NOT EXISTS idx_trades_challenge_executed ON trades(challenge_id, executed_at, id);
 CREATE INDEX IF NOT EXISTS idx_challenges_user_id ON user_challenges(user_id);
 CREATE INDEX IF NOT EXISTS idx_challenges_status ON user_challenges(status);
+-- Running daily counters (added after the initial schema)
+ALTER TABLE user_challenges ADD COLUMN IF NOT EXISTS daily_trade_count INTEGER DEFAULT 0;
+ALTER TABLE user_challenges ADD COLUMN IF NOT EXISTS pnl_day DATE;
 CREATE INDEX IF NOT EXISTS idx_market_data_symbol ON market_data(symbol);
+-- Change counter for /market-data?since= (added after the initial schema)
+ALTER TABLE market_data ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+CREATE INDEX IF NOT EXISTS idx_market_data_version ON market_data(version);
+CREATE INDEX IF NOT EXISTS idx_symbol_demand_requested ON symbol_demand(last_requested_at);
 CREATE INDEX IF NOT EXISTS idx_positions_challenge ON positions(challenge_id);
-CREATE INDEX IF NOT EXISTS idx_ai_signals_symbol ON ai_signals(symbol);
+CREATE INDEX IF NOT EXISTS idx_pending_orders_status_symbol ON pending_orders(status, symbol);
+CREATE INDEX IF NOT EXISTS idx_pending_orders_challenge ON pending_orders(challenge_id);
+CREATE INDEX IF NOT EXISTS idx_equity_snapshots_challenge_bucket ON equity_snapshots(challenge_id, bucket_at);
+CREATE INDEX IF NOT EXISTS idx_equity_snapshots_resolution_bucket ON equity_snapshots(resolution, bucket_at);
+
+-- One current signal per symbol (signals are upserted ON CONFLICT (symbol)).
+-- On existing databases, drop older duplicates before adding the index.
+DELETE FROM ai_signals a USING ai_signals b WHERE a.symbol = b.symbol AND a.id < b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_ai_signals_symbol ON ai_signals(symbol);
 
 -- Leaderboard View
 CREATE OR REPLACE VIEW leaderboard AS
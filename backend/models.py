@@ -54,7 +54,9 @@ class UserChallenge(db.Model):
     initial_balance = db.Column(db.Numeric(12, 2), nullable=False)
     current_balance = db.Column(db.Numeric(12, 2), nullable=False)
     equity = db.Column(db.Numeric(12, 2), nullable=False)
-    daily_pnl = db.Column(db.Numeric(12, 2), default=0)
+    daily_pnl = db.Column(db.Numeric(12, 2), default=0)  # Realized P&L of pnl_day
+    daily_trade_count = db.Column(db.Integer, default=0)  # Trades executed on pnl_day
+    pnl_day = db.Column(db.Date)  # Trading day the daily counters belong to
     total_pnl = db.Column(db.Numeric(12, 2), default=0)
     daily_high_equity = db.Column(db.Numeric(12, 2))  # For daily drawdown calculation
     status = db.Column(db.String(20), default='active', index=True)  # active, passed, failed
@@ -102,6 +104,7 @@ class UserChallenge(db.Model):
             'current_balance': float(self.current_balance),
             'equity': float(self.equity),
             'daily_pnl': float(self.daily_pnl or 0),
+            'daily_trade_count': self.daily_trade_count or 0,
             'total_pnl': float(self.total_pnl or 0),
             'status': self.status,
             'profit_percent': round((float(self.equity) - float(self.initial_balance)) / float(self.initial_balance) * 100, 2),
@@ -113,6 +116,12 @@ class UserChallenge(db.Model):
 class Trade(db.Model):
     """Individual trade records"""
     __tablename__ = 'trades'
+    # Keyset pagination of /history walks (executed_at, id) newest first
+    __table_args__ = (
+        db.Index('idx_trades_user_executed', 'user_id', 'executed_at', 'id'),
+        db.Index('idx_trades_user_symbol_executed', 'user_id', 'symbol', 'executed_at', 'id'),
+        db.Index('idx_trades_challenge_executed', 'challenge_id', 'executed_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
@@ -143,6 +152,61 @@ class Trade(db.Model):
         }
 
 
+class DailyPnl(db.Model):
+    """Realized P&L and trade count per challenge per trading day"""
+    __tablename__ = 'challenge_daily_pnl'
+    __table_args__ = (
+        # Trades increment their day's row with an upsert on this key
+        db.UniqueConstraint('challenge_id', 'day', name='uq_challenge_daily_pnl_day'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    realized_pnl = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'challenge_id': self.challenge_id,
+            'day': self.day.isoformat(),
+            'realized_pnl': float(self.realized_pnl),
+            'trade_count': self.trade_count
+        }
+
+
+class EquitySnapshot(db.Model):
+    """Equity of a challenge over time: raw points compacted into minute / hour / day buckets"""
+    __tablename__ = 'equity_snapshots'
+    __table_args__ = (
+        # Equity curve reads walk one challenge's buckets in time order
+        db.Index('idx_equity_snapshots_challenge_bucket', 'challenge_id', 'bucket_at'),
+        # Compaction folds one resolution's points older than a cutoff
+        db.Index('idx_equity_snapshots_resolution_bucket', 'resolution', 'bucket_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False, default='raw')  # raw, minute, hour, day
+    bucket_at = db.Column(db.DateTime, nullable=False)  # Sample time, or bucket start
+    open_equity = db.Column(db.Numeric(12, 2), nullable=False)
+    high_equity = db.Column(db.Numeric(12, 2), nullable=False)
+    low_equity = db.Column(db.Numeric(12, 2), nullable=False)
+    close_equity = db.Column(db.Numeric(12, 2), nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=1)
+
+    def to_dict(self):
+        return {
+            'at': self.bucket_at.isoformat(),
+            'resolution': self.resolution,
+            'open': float(self.open_equity),
+            'high': float(self.high_equity),
+            'low': float(self.low_equity),
+            'close': float(self.close_equity),
+            'samples': self.samples
+        }
+
+
 class Position(db.Model):
     """Open positions"""
     __tablename__ = 'positions'
@@ -173,6 +237,48 @@ class Position(db.Model):
         }
 
 
+class PendingOrder(db.Model):
+    """Limit / stop-loss / take-profit orders waiting for their trigger price"""
+    __tablename__ = 'pending_orders'
+    __table_args__ = (
+        # The order book loads pending orders by symbol on each sync
+        db.Index('idx_pending_orders_status_symbol', 'status', 'symbol'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    challenge_id = db.Column(db.Integer, db.ForeignKey('user_challenges.id'), nullable=False, index=True)
+    symbol = db.Column(db.String(20), nullable=False)
+    market = db.Column(db.String(20), nullable=False)
+    side = db.Column(db.String(10), nullable=False)  # buy, sell
+    order_type = db.Column(db.String(20), nullable=False)  # limit, stop_loss, take_profit
+    quantity = db.Column(db.Numeric(18, 8), nullable=False)
+    trigger_price = db.Column(db.Numeric(18, 8), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, filled, cancelled, rejected
+    reason = db.Column(db.String(200))
+    filled_price = db.Column(db.Numeric(18, 8))
+    trade_id = db.Column(db.Integer, db.ForeignKey('trades.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    closed_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'market': self.market,
+            'side': self.side,
+            'order_type': self.order_type,
+            'quantity': float(self.quantity),
+            'trigger_price': float(self.trigger_price),
+            'status': self.status,
+            'reason': self.reason,
+            'filled_price': float(self.filled_price) if self.filled_price else None,
+            'trade_id': self.trade_id,
+            'created_at': self.created_at.isoformat(),
+            'closed_at': self.closed_at.isoformat() if self.closed_at else None
+        }
+
+
 class MarketData(db.Model):
     """Cached market data"""
     __tablename__ = 'market_data'
@@ -187,6 +293,27 @@ class MarketData(db.Model):
     change_percent = db.Column(db.Numeric(8, 4))
     volume = db.Column(db.Numeric(20, 2))
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    # Table-wide change counter, bumped on every write (delta cursor / ETag)
+    version = db.Column(db.BigInteger, nullable=False, default=0, index=True)
+
+    # pg_advisory_xact_lock key serialising version allocation
+    VERSION_LOCK_KEY = 7201
+
+    @classmethod
+    def next_version(cls):
+        """
+        Allocate the version for rows written in the current transaction.
+
+        On PostgreSQL an advisory lock held until commit serialises writers,
+        so versions become visible in increasing order and a `since` cursor
+        never skips a row committed late.
+        """
+        if db.session.get_bind().dialect.name == 'postgresql':
+            db.session.execute(
+                db.text('SELECT pg_advisory_xact_lock(:key)'),
+                {'key': cls.VERSION_LOCK_KEY}
+            )
+        return (db.session.query(db.func.max(cls.version)).scalar() or 0) + 1
 
     def to_dict(self):
         return {
@@ -198,16 +325,40 @@ class MarketData(db.Model):
             'low': float(self.low_price) if self.low_price else None,
             'change_percent': float(self.change_percent) if self.change_percent else None,
             'volume': float(self.volume) if self.volume else None,
-            'last_updated': self.last_updated.isoformat()
+            'last_updated': self.last_updated.isoformat(),
+            'version': self.version
+        }
+
+
+class SymbolDemand(db.Model):
+    """When a symbol was last looked at (quotes, charts) - drives refresh rates"""
+    __tablename__ = 'symbol_demand'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(20), unique=True, nullable=False)
+    market = db.Column(db.String(20), nullable=False)
+    source = db.Column(db.String(20))  # quote, chart, stream
+    last_requested_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'market': self.market,
+            'source': self.source,
+            'last_requested_at': self.last_requested_at.isoformat()
         }
 
 
 class AISignal(db.Model):
     """AI-generated trading signals"""
     __tablename__ = 'ai_signals'
+    __table_args__ = (
+        # One current signal per symbol; signals are upserted on this key
+        db.UniqueConstraint('symbol', name='uq_ai_signals_symbol'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    symbol = db.Column(db.String(20), nullable=False, index=True)
+    symbol = db.Column(db.String(20), nullable=False)
     market = db.Column(db.String(20), nullable=False)
     signal_type = db.Column(db.String(10), nullable=False)  # buy, sell, hold
     confidence = db.Column(db.Numeric(5, 2))
@@ -236,3 +387,36 @@ class AdminSetting(db.Model):
     value = db.Column(db.Text)
     category = db.Column(db.String(50))
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ScheduledJob(db.Model):
+    """Background job lock and run statistics (one row per job)"""
+    __tablename__ = 'scheduled_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), unique=True, nullable=False)
+    locked_by = db.Column(db.String(100))  # hostname:pid of the worker holding the lease
+    locked_until = db.Column(db.DateTime)
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_duration_ms = db.Column(db.Integer)
+    last_status = db.Column(db.String(20))  # success, error
+    last_error = db.Column(db.Text)
+    run_count = db.Column(db.Integer, default=0)
+    error_count = db.Column(db.Integer, default=0)
+    total_duration_ms = db.Column(db.BigInteger, default=0)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'locked_by': self.locked_by,
+            'locked_until': self.locked_until.isoformat() if self.locked_until else None,
+            'last_started_at': self.last_started_at.isoformat() if self.last_started_at else None,
+            'last_finished_at': self.last_finished_at.isoformat() if self.last_finished_at else None,
+            'last_duration_ms': self.last_duration_ms,
+            'avg_duration_ms': round(self.total_duration_ms / self.run_count, 1) if self.run_count else None,
+            'last_status': self.last_status,
+            'last_error': self.last_error,
+            'run_count': self.run_count or 0,
+            'error_count': self.error_count or 0
+        }
@@ -2,9 +2,11 @@
 Admin & SuperAdmin Routes
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import User, UserChallenge, Trade, AdminSetting, db
+from models import User, UserChallenge, Trade, AdminSetting, ScheduledJob, db
+from routes.trading import market_service, demand_tracker, order_book, risk_engine
+from services.stream_hub import stream_hub
 from functools import wraps
 
 admin_bp = Blueprint('admin', __name__)
@@ -177,6 +179,48 @@ def get_admin_stats():
     })
 
 
+@admin_bp.route('/market-stats', methods=['GET'])
+@admin_required
+def get_market_stats():
+    """Get market data service statistics (cache, sources, market hours, stream, demand, orders, risk)"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'cache': market_service.get_cache_stats(),
+            'sources': market_service.get_source_stats(),
+            'markets': market_service.get_market_hours(),
+            'stream': stream_hub.stats(),
+            'demand': demand_tracker.stats(),
+            'orders': order_book.stats(),
+            'risk': risk_engine.stats()
+        }
+    })
+
+
+@admin_bp.route('/jobs', methods=['GET'])
+@admin_required
+def get_scheduled_jobs():
+    """Get background job leases and run-time statistics"""
+    jobs = ScheduledJob.query.order_by(ScheduledJob.name).all()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'jobs': [j.to_dict() for j in jobs]
+        }
+    })
+
+
+@admin_bp.route('/startup', methods=['GET'])
+@admin_required
+def get_startup_timing():
+    """Get this worker's boot timing report (imports, blueprint registration)"""
+    return jsonify({
+        'success': True,
+        'data': current_app.extensions['startup_timer'].report()
+    })
+
+
 # ==================== SuperAdmin Routes ====================
 
 @admin_bp.route('/superadmin/settings', methods=['GET'])
@@ -5,6 +5,8 @@ Challenge Routes - Core Prop Firm Logic
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import UserChallenge, User, db
+from services.equity_history import equity_curve, CURVE_POINTS, CURVE_MAX_POINTS
+from routes.trading import parse_query_time
 from datetime import datetime
 
 challenges_bp = Blueprint('challenges', __name__)
@@ -238,3 +240,54 @@ def get_challenge_status(challenge_id):
         'success': True,
         'data': status_data
     })
+
+
+@challenges_bp.route('/<int:challenge_id>/equity-curve', methods=['GET'])
+@jwt_required()
+def get_equity_curve(challenge_id):
+    """
+    Get the challenge's equity curve as OHLC buckets.
+
+    ?start= / ?end= (ISO dates, UTC) default to the challenge's lifetime;
+    ?points= caps how many buckets come back (default 200, max 1000).
+    """
+    user_id = int(get_jwt_identity())
+
+    challenge = UserChallenge.query.filter_by(
+        id=challenge_id,
+        user_id=user_id
+    ).first()
+
+    if not challenge:
+        return jsonify({
+            'success': False,
+            'error': 'Challenge not found'
+        }), 404
+
+    try:
+        start = parse_query_time(request.args['start']) if 'start' in request.args else challenge.start_date
+        end = parse_query_time(request.args['end'], end=True) if 'end' in request.args else datetime.utcnow()
+        points = int(request.args.get('points', CURVE_POINTS))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid start, end or points'
+        }), 400
+
+    if end <= start or points < 1:
+        return jsonify({
+            'success': False,
+            'error': 'Invalid start, end or points'
+        }), 400
+
+    curve = equity_curve(challenge.id, start, end, min(points, CURVE_MAX_POINTS))
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'challenge_id': challenge.id,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            **curve
+        }
+    })
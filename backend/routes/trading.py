@@ -2,37 +2,76 @@
 Trading Routes - Market Data & Trade Execution
 """
 
-from flask import Blueprint, request, jsonify
+import base64
+import time
+from flask import Blueprint, Response, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import Trade, Position, UserChallenge, MarketData, AISignal, db
+from models import Trade, Position, PendingOrder, UserChallenge, MarketData, AISignal, db
+from sqlalchemy import tuple_
 from services.market_data import MarketDataService
 from services.challenge_engine import ChallengeEngine
 from services.ai_signals import AISignalService
-from datetime import datetime
+from services.demand_tracker import DemandTracker
+from services.history_store import INTERVAL_SECONDS, PERIOD_DAYS
+from services.order_book import OrderBook, TRIGGER_DIRECTIONS
+from services.risk_engine import RiskEngine
+from services.position_index import PositionIndex
+from services.stream_hub import (
+    stream_hub, format_sse, publish_price, publish_signal, publish_challenge
+)
+from datetime import date, datetime, timedelta, timezone
 
 trading_bp = Blueprint('trading', __name__)
 market_service = MarketDataService()
 challenge_engine = ChallengeEngine()
 ai_signal_service = AISignalService()
+demand_tracker = DemandTracker()
+order_book = OrderBook()
+position_index = PositionIndex()
+risk_engine = RiskEngine(position_index)
 
 
 @trading_bp.route('/market-data', methods=['GET'])
 def get_all_market_data():
-    """Get all available market data"""
+    """
+    Get all available market data.
+
+    ?since=<cursor> returns only the rows written after the `cursor` of an
+    earlier response. The ETag is the latest version, so a poll with
+    If-None-Match gets an empty 304 when nothing changed.
+    """
     market = request.args.get('market')  # us, morocco, crypto
+    since = request.args.get('since', type=int)
 
     query = MarketData.query
     if market:
         query = query.filter_by(market=market)
 
-    data = query.all()
+    cursor = query.with_entities(db.func.max(MarketData.version)).scalar() or 0
+    etag = f'market-data-{cursor}'
 
-    return jsonify({
-        'success': True,
-        'data': {
-            'prices': [d.to_dict() for d in data]
-        }
-    })
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        if since is not None:
+            query = query.filter(MarketData.version > since)
+        data = query.all()
+        # Rows committed after the max() above carry a newer version
+        cursor = max([cursor] + [d.version for d in data])
+
+        response = jsonify({
+            'success': True,
+            'data': {
+                'prices': [d.to_dict() for d in data],
+                'cursor': cursor,
+                'since': since
+            }
+        })
+
+    response.set_etag(etag)
+    # Let browsers cache the body but revalidate on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 
 @trading_bp.route('/market-data/<symbol>', methods=['GET'])
@@ -41,8 +80,33 @@ def get_symbol_data(symbol):
     # Try to get from cache first
     cached = MarketData.query.filter_by(symbol=symbol.upper()).first()
 
-    # If cache is old (>30s), refresh
-    if cached and (datetime.utcnow() - cached.last_updated).seconds < 30:
+    # Refresh inline if the cache is old (>30s). A row written after its
+    # market closed holds the closing price until the next open. With the
+    # background scheduler running, rows of symbols it refreshes are kept
+    # fresh for us - up to its idle interval plus a tick, in case the
+    # worker running it stalls.
+    fresh = False
+    if cached:
+        age = (datetime.utcnow() - cached.last_updated).total_seconds()
+        scheduled_bound = (
+            current_app.config['PRICE_IDLE_REFRESH_SECONDS'] + current_app.config['PRICE_REFRESH_SECONDS']
+        )
+        fresh = (
+            age < 30
+            or market_service.has_closing_price(cached.market, cached.last_updated)
+            or (
+                current_app.config['SCHEDULER_ENABLED']
+                and age < scheduled_bound
+                and demand_tracker.in_universe(cached.symbol, market_service.tracked_symbols())
+            )
+        )
+    if fresh:
+        # The row may hold a fallback quote for a made-up symbol: only
+        # renew demand for listed symbols or ones recorded from a real quote
+        demand_tracker.record(
+            cached.symbol, cached.market,
+            existing_only=cached.symbol not in market_service.tracked_symbols()
+        )
         return jsonify({
             'success': True,
             'data': {'price': cached.to_dict()}
@@ -57,17 +121,21 @@ def get_symbol_data(symbol):
             cached.price = price_data['price']
             cached.change_percent = price_data.get('change_percent')
             cached.last_updated = datetime.utcnow()
+            cached.version = MarketData.next_version()
         else:
             cached = MarketData(
                 symbol=symbol.upper(),
                 market=price_data.get('market', 'us'),
                 price=price_data['price'],
                 change_percent=price_data.get('change_percent'),
-                last_updated=datetime.utcnow()
+                last_updated=datetime.utcnow(),
+                version=MarketData.next_version()
             )
             db.session.add(cached)
 
         db.session.commit()
+        if not price_data.get('is_fallback'):
+            demand_tracker.record(cached.symbol, cached.market)
 
         return jsonify({
             'success': True,
@@ -83,10 +151,13 @@ def get_symbol_data(symbol):
 @trading_bp.route('/refresh-prices', methods=['POST'])
 def refresh_prices():
     """Refresh all market prices and regenerate AI signals (called by scheduler)"""
-    updated = market_service.refresh_all_prices()
+    # ?batch=false falls back to the one-symbol-at-a-time refresh
+    batch = request.args.get('batch', 'true').lower() != 'false'
+    updated = market_service.refresh_all_prices(batch=batch, commit=False)
 
-    # Generate new AI signals based on updated prices
+    # Generate new AI signals based on updated prices (commits both)
     signals = ai_signal_service.generate_all_signals()
+    market_service.notify_prices()
 
     return jsonify({
         'success': True,
@@ -94,61 +165,165 @@ def refresh_prices():
     })
 
 
-@trading_bp.route('/execute', methods=['POST'])
-@jwt_required()
-def execute_trade():
-    """Execute a trade"""
-    user_id = int(get_jwt_identity())
-    data = request.get_json()
+@trading_bp.route('/stream', methods=['GET'])
+@jwt_required(locations=['headers', 'query_string'])
+def stream_updates():
+    """
+    Server-Sent Events stream replacing dashboard polling.
 
-    # Validate input
-    symbol = data.get('symbol', '').upper()
-    side = data.get('side', '').lower()
-    quantity = data.get('quantity')
-    market = data.get('market', 'us')
-
-    if not symbol or side not in ['buy', 'sell'] or not quantity:
+    ?topics=prices,signals,challenge picks what to receive (default: all);
+    ?symbols=AAPL,BTC-USD narrows price ticks to those symbols. Events are
+    `price`, `signal` and `challenge` (the user's active challenge). The
+    connection is closed after STREAM_MAX_SECONDS; EventSource reconnects.
+    Returns 503 once STREAM_MAX_PER_WORKER streams are open on this worker.
+    """
+    user_id = int(get_jwt_identity())
+    requested = request.args.get('topics', 'prices,signals,challenge').split(',')
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+
+    topics = set()
+    if 'prices' in requested:
+        topics.update([f'prices:{s}' for s in symbols] or ['prices'])
+        for symbol in symbols:
+            symbol, market = market_service.resolve_symbol(symbol)
+            demand_tracker.record(
+                symbol, market, source='stream',
+                existing_only=symbol not in market_service.tracked_symbols()
+            )
+    if 'signals' in requested:
+        topics.add('signals')
+    if 'challenge' in requested:
+        challenge = UserChallenge.query.filter_by(user_id=user_id, status='active').first()
+        if challenge:
+            topics.add(f'challenge:{challenge.id}')
+
+    if not topics:
         return jsonify({
             'success': False,
-            'error': 'Invalid trade parameters'
+            'error': 'No valid topics requested'
         }), 400
 
-    quantity = float(quantity)
-    if quantity <= 0:
+    app = current_app._get_current_object()
+    keepalive = app.config['STREAM_KEEPALIVE_SECONDS']
+    max_seconds = app.config['STREAM_MAX_SECONDS']
+
+    # Each stream holds a worker thread; past the cap clients poll instead
+    subscription = stream_hub.subscribe(topics, limit=app.config['STREAM_MAX_PER_WORKER'])
+    if subscription is None:
         return jsonify({
             'success': False,
-            'error': 'Quantity must be positive'
-        }), 400
+            'error': 'Too many open streams, poll for updates instead'
+        }), 503, {'Retry-After': str(max_seconds)}
+
+    stream_hub.ensure_pump(app, _pump_stream_updates, app.config['STREAM_PUMP_SECONDS'])
+    # Release the DB connection, the stream may stay open for minutes.
+    # The generator below only reads the subscription queue, so it needs
+    # no request or app context.
+    db.session.remove()
+
+    def generate():
+        deadline = time.monotonic() + max_seconds
+        # Ask EventSource to reconnect after 3s when the stream ends
+        yield 'retry: 3000\n\n'
+        yield format_sse('ready', {'topics': sorted(topics)})
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=keepalive)
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            yield format_sse(*message)
 
-    # Get active challenge
-    challenge = UserChallenge.query.filter_by(
-        user_id=user_id,
-        status='active'
-    ).first()
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, even if the client left
+    # before the first event, so the stream slot is always given back
+    response.call_on_close(lambda: stream_hub.unsubscribe(subscription))
+    return response
 
-    if not challenge:
-        return jsonify({
-            'success': False,
-            'error': 'No active challenge. Please purchase a challenge first.'
-        }), 400
 
-    # Get current price
-    price_data = market_service.get_price(symbol)
-    if not price_data:
-        return jsonify({
-            'success': False,
-            'error': f'Could not get price for {symbol}'
-        }), 400
+# Last MarketData version / AISignal generated_at seen by this worker's stream pump
+_stream_cursor = {'prices': None, 'signals': None}
+
+
+def _pump_stream_updates():
+    """
+    Publish rows changed by other workers (scheduler refresh, trades) since
+    the last pass. Runs in the stream pump thread while anyone is
+    subscribed; publish_* drop anything this worker already sent.
+    """
+    if stream_hub.topics_with_prefix('prices'):
+        _pump_rows('prices', MarketData, MarketData.version, publish_price, floor=0)
+
+    if stream_hub.has_subscribers('signals'):
+        _pump_rows('signals', AISignal, AISignal.generated_at, publish_signal, floor=datetime.min)
+
+    challenge_ids = [int(t.split(':', 1)[1]) for t in stream_hub.topics_with_prefix('challenge:')]
+    if challenge_ids:
+        for challenge in UserChallenge.query.filter(UserChallenge.id.in_(challenge_ids)).all():
+            publish_challenge(challenge)
+
+    db.session.remove()
+
+
+def _pump_rows(name, model, updated_column, publish, floor):
+    """Publish rows of `model` updated after the cursor and advance it"""
+    cursor = _stream_cursor[name]
+    if cursor is None:
+        # First pass only sets the cursor: older rows are not news, and
+        # could be staler than what this worker already published
+        _stream_cursor[name] = db.session.query(db.func.max(updated_column)).scalar() or floor
+        return
+
+    for row in model.query.filter(updated_column > cursor).all():
+        publish(row.to_dict())
+        _stream_cursor[name] = max(_stream_cursor[name], getattr(row, updated_column.key))
 
-    current_price = price_data['price']
+
+# Most orders accepted by one /execute-batch request
+MAX_BATCH_ORDERS = 50
+
+
+def _parse_order(data):
+    """Validate one order payload. Returns (order, None) or (None, error)."""
+    if not isinstance(data, dict):
+        return None, 'Invalid trade parameters'
+
+    symbol = str(data.get('symbol') or '').upper()
+    side = str(data.get('side') or '').lower()
+    quantity = data.get('quantity')
+    market = data.get('market', 'us')
+
+    if not symbol or side not in ['buy', 'sell'] or not quantity:
+        return None, 'Invalid trade parameters'
+
+    try:
+        quantity = float(quantity)
+    except (TypeError, ValueError):
+        return None, 'Invalid trade parameters'
+
+    if quantity <= 0:
+        return None, 'Quantity must be positive'
+
+    return {'symbol': symbol, 'side': side, 'quantity': quantity, 'market': market}, None
+
+
+def _apply_order(user_id, challenge, positions, order, current_price):
+    """
+    Apply one validated order to the challenge balance and its positions in
+    the session, without committing. `positions` maps symbol -> Position
+    and is kept up to date. Returns (trade, None) or (None, error).
+    """
+    symbol = order['symbol']
+    side = order['side']
+    quantity = order['quantity']
+    market = order['market']
     trade_value = quantity * current_price
 
     # Check if user has enough balance for buy
     if side == 'buy' and trade_value > float(challenge.current_balance):
-        return jsonify({
-            'success': False,
-            'error': 'Insufficient balance'
-        }), 400
+        return None, 'Insufficient balance'
 
     # Create trade
     trade = Trade(
@@ -162,11 +337,7 @@ def execute_trade():
         status='open'
     )
 
-    # Create or update position
-    position = Position.query.filter_by(
-        challenge_id=challenge.id,
-        symbol=symbol
-    ).first()
+    position = positions.get(symbol)
 
     if side == 'buy':
         if position:
@@ -188,16 +359,14 @@ def execute_trade():
                 current_price=current_price
             )
             db.session.add(position)
+            positions[symbol] = position
 
         # Deduct from balance
         challenge.current_balance = float(challenge.current_balance) - trade_value
 
     else:  # sell
         if not position or float(position.quantity) < quantity:
-            return jsonify({
-                'success': False,
-                'error': 'Insufficient position to sell'
-            }), 400
+            return None, 'Insufficient position to sell'
 
         # Calculate profit
         profit = (current_price - float(position.entry_price)) * quantity
@@ -209,17 +378,103 @@ def execute_trade():
         # Update position
         remaining = float(position.quantity) - quantity
         if remaining <= 0:
+            if position in db.session.new:
+                # Opened earlier in the same batch: write it (and the trades
+                # before this one) first, so inserts keep the order they
+                # were made in
+                db.session.flush()
             db.session.delete(position)
+            del positions[symbol]
         else:
             position.quantity = remaining
 
         # Update balance
         challenge.current_balance = float(challenge.current_balance) + trade_value
         challenge.total_pnl = float(challenge.total_pnl or 0) + profit
-        challenge.daily_pnl = float(challenge.daily_pnl or 0) + profit
 
     db.session.add(trade)
+    # Running daily P&L and trade count, plus the day's rollup row
+    challenge_engine.record_trade(challenge, float(trade.profit or 0))
+    return trade, None
+
+
+def _lock_challenge(challenge):
+    """
+    Re-read `challenge` with a row lock held until commit, so a user trade
+    and a triggered fill cannot both debit the balance they read. Returns
+    False if the challenge closed meanwhile.
+    """
+    db.session.refresh(challenge, with_for_update=True)
+    return challenge.status == 'active'
+
+
+def _index_positions(challenge_id, symbols, positions):
+    """Mirror committed opens / closes of `symbols` into the position index"""
+    for symbol in symbols:
+        if symbol in positions:
+            position_index.add(challenge_id, symbol)
+        else:
+            position_index.remove(challenge_id, symbol)
+
+
+@trading_bp.route('/execute', methods=['POST'])
+@jwt_required()
+def execute_trade():
+    """Execute a trade"""
+    user_id = int(get_jwt_identity())
+
+    # Validate input
+    order, error = _parse_order(request.get_json())
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
+    symbol = order['symbol']
+
+    # Get active challenge
+    challenge = UserChallenge.query.filter_by(
+        user_id=user_id,
+        status='active'
+    ).first()
+
+    if not challenge:
+        return jsonify({
+            'success': False,
+            'error': 'No active challenge. Please purchase a challenge first.'
+        }), 400
+
+    # Get current price
+    price_data = market_service.get_price(symbol)
+    if not price_data:
+        return jsonify({
+            'success': False,
+            'error': f'Could not get price for {symbol}'
+        }), 400
+
+    # Locked after the (possibly upstream) price lookup, not during it
+    if not _lock_challenge(challenge):
+        return jsonify({
+            'success': False,
+            'error': f'Challenge already {challenge.status}'
+        }), 400
+
+    position = Position.query.filter_by(
+        challenge_id=challenge.id,
+        symbol=symbol
+    ).first()
+    positions = {symbol: position} if position else {}
+
+    trade, error = _apply_order(user_id, challenge, positions, order, price_data['price'])
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
     db.session.commit()
+    _index_positions(challenge.id, [symbol], positions)
 
     # Evaluate challenge rules (The Killer Function)
     status, reason = challenge_engine.evaluate_rules(challenge.id)
@@ -236,6 +491,335 @@ def execute_trade():
     })
 
 
+@trading_bp.route('/execute-batch', methods=['POST'])
+@jwt_required()
+def execute_trade_batch():
+    """
+    Execute a list of orders against the active challenge.
+
+    Body: {"orders": [{symbol, side, quantity, market}, ...], "atomic": false}.
+    Orders are applied in request order with one price lookup per symbol,
+    committed in a single transaction, and the challenge rules are
+    evaluated once at the end. Rejected orders are reported per index; with
+    "atomic": true any rejection rolls back the whole batch.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    orders = data.get('orders')
+    atomic = bool(data.get('atomic', False))
+
+    if not isinstance(orders, list) or not orders:
+        return jsonify({
+            'success': False,
+            'error': 'orders must be a non-empty list'
+        }), 400
+
+    if len(orders) > MAX_BATCH_ORDERS:
+        return jsonify({
+            'success': False,
+            'error': f'At most {MAX_BATCH_ORDERS} orders per batch'
+        }), 400
+
+    challenge = UserChallenge.query.filter_by(
+        user_id=user_id,
+        status='active'
+    ).first()
+
+    if not challenge:
+        return jsonify({
+            'success': False,
+            'error': 'No active challenge. Please purchase a challenge first.'
+        }), 400
+
+    parsed = [_parse_order(order) for order in orders]
+    symbols = {order['symbol'] for order, _ in parsed if order}
+
+    # One bulk price lookup and one position query for the whole batch
+    prices = market_service.get_prices(symbols)
+    if not _lock_challenge(challenge):
+        return jsonify({
+            'success': False,
+            'error': f'Challenge already {challenge.status}'
+        }), 400
+
+    positions = {
+        p.symbol: p for p in Position.query.filter(
+            Position.challenge_id == challenge.id,
+            Position.symbol.in_(symbols)
+        )
+    }
+
+    results = []
+    trades = []
+    for index, (order, error) in enumerate(parsed):
+        trade = None
+        if not error:
+            price_data = prices.get(order['symbol'])
+            if not price_data:
+                error = f"Could not get price for {order['symbol']}"
+            else:
+                trade, error = _apply_order(user_id, challenge, positions, order, price_data['price'])
+
+        results.append({'index': index, 'success': error is None, 'error': error})
+        trades.append(trade)
+
+    rejected = sum(1 for r in results if not r['success'])
+    if atomic and rejected:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': f'{rejected} order(s) rejected, batch rolled back',
+            'data': {'results': results}
+        }), 400
+
+    db.session.commit()
+    _index_positions(challenge.id, symbols, positions)
+
+    # Evaluate challenge rules once for the whole batch
+    status, reason = challenge_engine.evaluate_rules(challenge.id)
+
+    for result, trade in zip(results, trades):
+        if trade is not None:
+            result['trade'] = trade.to_dict()
+
+    return jsonify({
+        'success': True,
+        'message': f'{len(results) - rejected} of {len(results)} orders executed',
+        'data': {
+            'results': results,
+            'challenge_status': status,
+            'status_reason': reason if status != 'active' else None,
+            'new_balance': float(challenge.current_balance)
+        }
+    })
+
+
+# Most orders returned by GET /orders
+MAX_LISTED_ORDERS = 200
+
+
+def _fill_orders(order_ids, prices):
+    """Fill, reject or cancel the pending orders among `order_ids`; commits"""
+    # Skip orders cancelled since they were booked, or taken by another run
+    orders = PendingOrder.query.filter(
+        PendingOrder.id.in_(order_ids),
+        PendingOrder.status == 'pending'
+    ).order_by(PendingOrder.id).with_for_update(skip_locked=True).all()
+
+    now = datetime.utcnow()
+    challenges = {}
+    positions = {}
+    fills = []
+    for pending in orders:
+        challenge_id = pending.challenge_id
+        if challenge_id not in challenges:
+            # Same row lock as user trades take, so neither overwrites the
+            # other's balance change
+            challenges[challenge_id] = db.session.get(
+                UserChallenge, challenge_id, with_for_update=True, populate_existing=True
+            )
+            positions[challenge_id] = {
+                p.symbol: p for p in Position.query.filter_by(challenge_id=challenge_id)
+            }
+        challenge = challenges[challenge_id]
+
+        pending.closed_at = now
+        if challenge.status != 'active':
+            pending.status = 'cancelled'
+            pending.reason = 'Challenge is no longer active'
+            continue
+
+        order = {
+            'symbol': pending.symbol,
+            'side': pending.side,
+            'quantity': float(pending.quantity),
+            'market': pending.market
+        }
+        price = prices[pending.symbol]
+        trade, error = _apply_order(pending.user_id, challenge, positions[challenge_id], order, price)
+        if error:
+            pending.status = 'rejected'
+            pending.reason = error
+        else:
+            pending.status = 'filled'
+            pending.filled_price = price
+            fills.append((pending, trade))
+
+    db.session.flush()
+    for pending, trade in fills:
+        pending.trade_id = trade.id
+    db.session.commit()
+    return fills, positions
+
+
+def _fill_triggered_orders(prices):
+    """
+    Price listener: fill the pending orders whose trigger `prices` just
+    crossed, at the new price. Runs on whichever worker refreshed them.
+    """
+    order_book.sync()
+    order_ids = order_book.crossed(prices)
+    if not order_ids:
+        return 0
+
+    try:
+        fills, positions = _fill_orders(order_ids, prices)
+    except Exception:
+        # Nothing was filled: put every popped order back in the book
+        db.session.rollback()
+        order_book.restore(order_ids)
+        raise
+
+    # Orders skipped while another run held them are still pending
+    order_book.restore(set(order_ids) - {pending.id for pending, _ in fills})
+    for pending, _ in fills:
+        _index_positions(pending.challenge_id, [pending.symbol], positions[pending.challenge_id])
+
+    for challenge_id in {pending.challenge_id for pending, _ in fills}:
+        challenge_engine.evaluate_rules(challenge_id)
+    return len(fills)
+
+
+# After each refresh: fill triggered orders, then revalue every challenge
+market_service.on_prices(_fill_triggered_orders)
+market_service.on_prices(risk_engine.evaluate)
+
+
+@trading_bp.route('/orders', methods=['POST'])
+@jwt_required()
+def place_order():
+    """
+    Place a limit, stop-loss or take-profit order.
+
+    Body: {symbol, side, quantity, market, order_type, trigger_price}. The
+    order rests in the book until a price refresh reaches trigger_price,
+    then fills at that price: buy limits, sell stop-losses at or below it;
+    sell limits, take-profits at or above it.
+    """
+    user_id = int(get_jwt_identity())
+    data = request.get_json()
+
+    order, error = _parse_order(data)
+    if not error:
+        # Stored under the key price refreshes use (BTC -> BTC-USD), or
+        # the order would never trigger
+        order['symbol'], order['market'] = market_service.resolve_symbol(order['symbol'])
+        order_type = str(data.get('order_type') or '').lower()
+        try:
+            trigger_price = float(data.get('trigger_price'))
+        except (TypeError, ValueError):
+            trigger_price = 0
+
+        if (order['side'], order_type) not in TRIGGER_DIRECTIONS:
+            error = f"Invalid order type for a {order['side']} order"
+        elif trigger_price <= 0:
+            error = 'Trigger price must be positive'
+
+    if error:
+        return jsonify({
+            'success': False,
+            'error': error
+        }), 400
+
+    challenge = UserChallenge.query.filter_by(
+        user_id=user_id,
+        status='active'
+    ).first()
+
+    if not challenge:
+        return jsonify({
+            'success': False,
+            'error': 'No active challenge. Please purchase a challenge first.'
+        }), 400
+
+    if order['side'] == 'sell':
+        position = Position.query.filter_by(
+            challenge_id=challenge.id,
+            symbol=order['symbol']
+        ).first()
+        if not position or float(position.quantity) < order['quantity']:
+            return jsonify({
+                'success': False,
+                'error': 'Insufficient position to sell'
+            }), 400
+
+    pending = PendingOrder(
+        user_id=user_id,
+        challenge_id=challenge.id,
+        symbol=order['symbol'],
+        market=order['market'],
+        side=order['side'],
+        order_type=order_type,
+        quantity=order['quantity'],
+        trigger_price=trigger_price,
+        status='pending'
+    )
+    db.session.add(pending)
+    db.session.commit()
+    order_book.add(pending)
+
+    return jsonify({
+        'success': True,
+        'message': 'Order placed',
+        'data': {'order': pending.to_dict()}
+    })
+
+
+@trading_bp.route('/orders', methods=['GET'])
+@jwt_required()
+def get_orders():
+    """Get the user's orders (?status=pending by default, or filled, cancelled, rejected, all)"""
+    user_id = int(get_jwt_identity())
+    status = request.args.get('status', 'pending')
+
+    query = PendingOrder.query.filter_by(user_id=user_id)
+    if status != 'all':
+        query = query.filter_by(status=status)
+
+    orders = query.order_by(PendingOrder.id.desc()).limit(MAX_LISTED_ORDERS).all()
+
+    return jsonify({
+        'success': True,
+        'data': {
+            'orders': [o.to_dict() for o in orders]
+        }
+    })
+
+
+@trading_bp.route('/orders/<int:order_id>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_order(order_id):
+    """Cancel a pending order"""
+    user_id = int(get_jwt_identity())
+
+    pending = PendingOrder.query.filter_by(
+        id=order_id,
+        user_id=user_id
+    ).with_for_update().first()
+
+    if not pending:
+        return jsonify({
+            'success': False,
+            'error': 'Order not found'
+        }), 404
+
+    if pending.status != 'pending':
+        return jsonify({
+            'success': False,
+            'error': f'Order is already {pending.status}'
+        }), 400
+
+    # The book drops it when its trigger is next crossed
+    pending.status = 'cancelled'
+    pending.closed_at = datetime.utcnow()
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'data': {'order': pending.to_dict()}
+    })
+
+
 @trading_bp.route('/positions', methods=['GET'])
 @jwt_required()
 def get_positions():
@@ -256,14 +840,11 @@ def get_positions():
 
     positions = Position.query.filter_by(challenge_id=challenge.id).all()
 
-    # Update current prices
-    for pos in positions:
-        price_data = market_service.get_price(pos.symbol)
-        if price_data:
-            pos.current_price = price_data['price']
-            pos.unrealized_pnl = (price_data['price'] - float(pos.entry_price)) * float(pos.quantity)
-
-    db.session.commit()
+    # Mark to market with one bulk price lookup; write only what moved
+    if positions:
+        prices = market_service.get_prices({p.symbol for p in positions})
+        if challenge_engine.mark_to_market(positions, prices):
+            db.session.commit()
 
     return jsonify({
         'success': True,
@@ -354,43 +935,52 @@ def get_historical_data(symbol):
     period = request.args.get('period', '1mo')
     interval = request.args.get('interval', '1d')
 
-    data = market_service.get_historical_data(symbol.upper(), period, interval)
+    # ?format=columns returns parallel arrays instead of one object per candle
+    output_format = request.args.get('format', 'candles')
+
+    # interval names the candle file on disk, so only known values get through
+    if interval not in INTERVAL_SECONDS or period not in PERIOD_DAYS:
+        return jsonify({
+            'success': False,
+            'error': f'interval must be one of {", ".join(INTERVAL_SECONDS)}; '
+                     f'period one of {", ".join(PERIOD_DAYS)}'
+        }), 400
+
+    try:
+        columns = market_service.get_historical_columns(symbol.upper(), period, interval)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
 
-    if not data:
+    if columns is None or not columns.shape[1]:
         return jsonify({
             'success': False,
             'error': f'No historical data available for {symbol}'
         }), 404
 
-    # Transform to lightweight-charts format
-    chart_data = []
-    for row in data:
-        try:
-            # Handle different date field names from various sources
-            date_val = row.get('Date') or row.get('seance') or row.get('date')
-            if not date_val:
-                continue
+    demand_tracker.record(*market_service.resolve_symbol(symbol), source='chart')
 
-            # Convert to unix timestamp
-            if isinstance(date_val, str):
-                dt = datetime.fromisoformat(date_val.split('T')[0].split(' ')[0])
-            else:
-                dt = date_val
-
-            timestamp = int(dt.timestamp())
-
-            chart_data.append({
-                'time': timestamp,
-                'open': float(row.get('Open') or row.get('open', 0)),
-                'high': float(row.get('High') or row.get('high', 0)),
-                'low': float(row.get('Low') or row.get('low', 0)),
-                'close': float(row.get('Close') or row.get('close', 0)),
-            })
-        except (ValueError, TypeError, AttributeError):
-            continue
+    # Columns are already normalised, deduplicated and sorted oldest first
+    # (required by lightweight-charts), so serialise straight from the arrays
+    times = columns[0].astype('int64').tolist()
+    opens, highs, lows, closes = columns[1:5].tolist()
 
-    # Sort by time (oldest first - required by lightweight-charts)
-    chart_data.sort(key=lambda x: x['time'])
+    if output_format == 'columns':
+        candles = {
+            'time': times,
+            'open': opens,
+            'high': highs,
+            'low': lows,
+            'close': closes
+        }
+    else:
+        # Transform to lightweight-charts format
+        candles = [
+            {'time': t, 'open': o, 'high': h, 'low': l, 'close': c}
+            for t, o, h, l, c in zip(times, opens, highs, lows, closes)
+        ]
 
     return jsonify({
         'success': True,
@@ -398,27 +988,103 @@ def get_historical_data(symbol):
             'symbol': symbol.upper(),
             'period': period,
             'interval': interval,
-            'candles': chart_data
+            'candles': candles
         }
     })
 
 
+# Trade history page size (default / max)
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+
+
+def parse_query_time(value, end=False):
+    """
+    Parse an ISO date or datetime query argument into naive UTC, like the
+    stored timestamps. A plain date as an `end` bound covers that whole day:
+    it comes back as the next midnight, to be compared exclusively.
+    """
+    try:
+        day = date.fromisoformat(value)
+    except ValueError:
+        day = None
+    if day is not None:
+        parsed = datetime.combine(day, datetime.min.time())
+        return parsed + timedelta(days=1) if end else parsed
+
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _encode_cursor(trade):
+    """Opaque keyset cursor for the position right after `trade`"""
+    raw = f'{trade.executed_at.isoformat()}|{trade.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    executed_at, trade_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    return datetime.fromisoformat(executed_at), int(trade_id)
+
+
 @trading_bp.route('/history', methods=['GET'])
 @jwt_required()
 def get_trade_history():
-    """Get trade history"""
+    """
+    Get trade history, newest first, one page at a time.
+
+    Filters: challenge_id, symbol, side, start / end (ISO date or datetime,
+    taken as UTC; a date-only end includes that day).
+    Pages are keyset-paginated over (executed_at, id): pass the previous
+    response's `next_cursor` as ?cursor= so every page costs an index range
+    scan of `limit` rows, however deep it is.
+    """
     user_id = int(get_jwt_identity())
-    challenge_id = request.args.get('challenge_id')
+    challenge_id = request.args.get('challenge_id', type=int)
+    symbol = request.args.get('symbol')
+    side = request.args.get('side')
+    limit = min(max(request.args.get('limit', HISTORY_PAGE_SIZE, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        start = parse_query_time(start) if start else None
+        end = parse_query_time(end, end=True) if end else None
+        cursor = request.args.get('cursor')
+        cursor = _decode_cursor(cursor) if cursor else None
+    except (ValueError, UnicodeDecodeError):
+        return jsonify({
+            'success': False,
+            'error': 'Invalid start, end or cursor'
+        }), 400
 
     query = Trade.query.filter_by(user_id=user_id)
     if challenge_id:
         query = query.filter_by(challenge_id=challenge_id)
-
-    trades = query.order_by(Trade.executed_at.desc()).limit(50).all()
+    if symbol:
+        query = query.filter_by(symbol=symbol.upper())
+    if side:
+        query = query.filter_by(side=side.lower())
+    if start:
+        query = query.filter(Trade.executed_at >= start)
+    if end:
+        query = query.filter(Trade.executed_at < end)
+    if cursor:
+        query = query.filter(tuple_(Trade.executed_at, Trade.id) < tuple_(*cursor))
+
+    # One extra row tells whether another page exists
+    trades = query.order_by(Trade.executed_at.desc(), Trade.id.desc()).limit(limit + 1).all()
+    has_more = len(trades) > limit
+    trades = trades[:limit]
 
     return jsonify({
         'success': True,
         'data': {
-            'trades': [t.to_dict() for t in trades]
+            'trades': [t.to_dict() for t in trades],
+            'next_cursor': _encode_cursor(trades[-1]) if has_more else None
         }
     })
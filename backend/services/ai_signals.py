@@ -5,6 +5,8 @@ Generates trading signals based on technical analysis of market data
 
 from datetime import datetime, timedelta
 from models import AISignal, MarketData, db
+from services.bulk_upsert import upsert
+from services.stream_hub import publish_signal
 
 
 class AISignalService:
@@ -127,12 +129,18 @@ class AISignalService:
         }
 
     def generate_all_signals(self) -> list:
-        """Generate signals for all tracked symbols"""
+        """Generate signals for all tracked symbols (one read, one upsert, one commit)"""
         signals_generated = []
 
+        # Get latest market data from cache. populate_existing makes sure
+        # rows upserted earlier in this transaction are not read stale.
+        market_rows = MarketData.query.filter(
+            MarketData.symbol.in_(self.all_symbols)
+        ).execution_options(populate_existing=True).all()
+        market_by_symbol = {m.symbol: m for m in market_rows}
+
         for symbol in self.all_symbols:
-            # Get latest market data from cache
-            market_data = MarketData.query.filter_by(symbol=symbol).first()
+            market_data = market_by_symbol.get(symbol)
 
             if market_data:
                 price_data = {
@@ -147,44 +155,58 @@ class AISignalService:
                 signal_data = self.generate_signal(symbol, price_data)
 
                 if signal_data:
-                    # Save or update signal in database
-                    self._save_signal(signal_data)
                     signals_generated.append(signal_data)
 
+        # Save or update all signals in database
+        self._save_signals(signals_generated)
+        db.session.commit()
+        self._publish_signals(signals_generated)
+
         return signals_generated
 
-    def _save_signal(self, signal_data: dict) -> AISignal:
+    def _save_signal(self, signal_data: dict) -> None:
         """Save signal to database"""
-        # Check if we have a recent signal for this symbol
-        existing = AISignal.query.filter_by(symbol=signal_data['symbol']).filter(
-            AISignal.expires_at > datetime.utcnow()
-        ).first()
-
-        expires_at = datetime.utcnow() + timedelta(hours=self.SIGNAL_EXPIRY_HOURS)
-
-        if existing:
-            # Update existing signal
-            existing.signal_type = signal_data['signal_type']
-            existing.confidence = signal_data['confidence']
-            existing.reasoning = signal_data['reasoning']
-            existing.generated_at = datetime.utcnow()
-            existing.expires_at = expires_at
-            signal = existing
-        else:
-            # Create new signal
-            signal = AISignal(
-                symbol=signal_data['symbol'],
-                market=signal_data['market'],
-                signal_type=signal_data['signal_type'],
-                confidence=signal_data['confidence'],
-                reasoning=signal_data['reasoning'],
-                generated_at=datetime.utcnow(),
-                expires_at=expires_at
-            )
-            db.session.add(signal)
-
+        self._save_signals([signal_data])
         db.session.commit()
-        return signal
+        self._publish_signals([signal_data])
+
+    def _save_signals(self, signals: list) -> int:
+        """Upsert signals keyed by symbol (one current signal per symbol)"""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=self.SIGNAL_EXPIRY_HOURS)
+
+        rows = [
+            {
+                'symbol': signal_data['symbol'],
+                'market': signal_data['market'],
+                'signal_type': signal_data['signal_type'],
+                'confidence': signal_data['confidence'],
+                'reasoning': signal_data['reasoning'],
+                'generated_at': now,
+                'expires_at': expires_at
+            }
+            for signal_data in signals
+        ]
+
+        return upsert(
+            AISignal, rows,
+            conflict_columns=['symbol'],
+            update_columns=['market', 'signal_type', 'confidence', 'reasoning',
+                            'generated_at', 'expires_at']
+        )
+
+    def _publish_signals(self, signals: list) -> None:
+        """Push changed signals to /stream subscribers"""
+        generated_at = datetime.utcnow().isoformat()
+        for signal_data in signals:
+            publish_signal({
+                'symbol': signal_data['symbol'],
+                'market': signal_data['market'],
+                'signal': signal_data['signal_type'],
+                'confidence': signal_data['confidence'],
+                'reasoning': signal_data['reasoning'],
+                'generated_at': generated_at
+            })
 
     def get_active_signals(self, market: str = None, limit: int = 10) -> list:
         """Get active (non-expired) signals"""
@@ -0,0 +1,84 @@
+"""
+Bulk Upsert
+Single-statement INSERT ... ON CONFLICT DO UPDATE for PostgreSQL and SQLite
+"""
+
+from sqlalchemy import select, tuple_, update
+from models import db
+
+# Keep each statement well under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+
+def upsert(model, rows, conflict_columns, update_columns, increment_columns=()):
+    """
+    Insert `rows` (list of column dicts) into `model`'s table, updating
+    `update_columns` on rows whose `conflict_columns` already exist.
+    `increment_columns` are added to the stored value instead of replacing
+    it (counters, running totals).
+
+    Runs in the current session's transaction; the caller commits. Dialects
+    without ON CONFLICT fall back to one SELECT plus bulk INSERT/UPDATE.
+    """
+    if not rows:
+        return 0
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return _upsert_generic(model, rows, conflict_columns, update_columns, increment_columns)
+
+    table = model.__table__
+    for i in range(0, len(rows), CHUNK_SIZE):
+        stmt = insert(table).values(rows[i:i + CHUNK_SIZE])
+        set_ = {name: stmt.excluded[name] for name in update_columns}
+        set_.update({name: table.c[name] + stmt.excluded[name] for name in increment_columns})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_=set_
+        )
+        db.session.execute(stmt)
+
+    return len(rows)
+
+
+def _upsert_generic(model, rows, conflict_columns, update_columns, increment_columns=()):
+    """Portable fallback: look up existing keys once, then bulk write"""
+    def key_of(row):
+        return tuple(row[c] for c in conflict_columns)
+
+    key_columns = [getattr(model, c) for c in conflict_columns]
+
+    existing = {}
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        if len(conflict_columns) == 1:
+            condition = key_columns[0].in_([row[conflict_columns[0]] for row in chunk])
+        else:
+            condition = tuple_(*key_columns).in_([key_of(row) for row in chunk])
+        for found in db.session.execute(select(model.id, *key_columns).where(condition)):
+            existing[tuple(found[1:])] = found[0]
+
+    inserts = [row for row in rows if key_of(row) not in existing]
+    updates = [
+        dict({name: row[name] for name in update_columns}, id=existing[key_of(row)])
+        for row in rows if key_of(row) in existing
+    ]
+
+    if inserts:
+        db.session.execute(model.__table__.insert(), inserts)
+    if updates and update_columns:
+        db.session.execute(update(model), updates)
+    # Increments depend on the stored value, so they go one row at a time
+    for row in rows:
+        if increment_columns and key_of(row) in existing:
+            db.session.execute(
+                update(model).where(model.id == existing[key_of(row)]).values({
+                    name: getattr(model, name) + row[name] for name in increment_columns
+                })
+            )
+
+    return len(rows)
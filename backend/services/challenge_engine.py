@@ -3,17 +3,61 @@ Challenge Engine - The Killer Function
 Evaluates challenge rules after each trade
 """
 
-from datetime import datetime, date
-from models import UserChallenge, Trade, Position, db
-from sqlalchemy import func
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, or_, update
+from models import UserChallenge, Trade, Position, DailyPnl, db
+from services.bulk_upsert import upsert
+from services.equity_history import record_snapshots
+from services.market_calendar import build_calendars
+from services.stream_hub import publish_challenge
+
+# Active challenges updated per statement by reset_daily_metrics
+RESET_BATCH_SIZE = 5000
 
 
 class ChallengeEngine:
     """
     Core engine for prop firm challenge logic.
     Implements the "Killer Function" that evaluates rules after each trade.
+
+    Daily metrics roll over at the daily reset: DAILY_RESET_HOUR (UTC) by
+    default, or the close of DAILY_RESET_MARKET (us, morocco) in that
+    market's timezone.
     """
 
+    def __init__(self, reset_market=None, reset_hour=None):
+        market = reset_market if reset_market is not None else os.environ.get('DAILY_RESET_MARKET', '')
+        calendar = build_calendars().get(market) if market else None
+
+        if calendar is not None and not calendar.always_open:
+            self.reset_market = market
+            self.reset_tz = calendar.tz
+            self.reset_offset = timedelta(
+                hours=calendar.close_time.hour, minutes=calendar.close_time.minute
+            )
+        else:
+            hour = reset_hour if reset_hour is not None else int(os.environ.get('DAILY_RESET_HOUR', 0))
+            self.reset_market = None
+            self.reset_tz = timezone.utc
+            self.reset_offset = timedelta(hours=hour)
+
+    def reset_time(self):
+        """(hour, minute, timezone) of the daily reset, for the scheduler"""
+        minutes = int(self.reset_offset.total_seconds() // 60)
+        return minutes // 60, minutes % 60, self.reset_tz
+
+    def trading_day(self, at=None):
+        """
+        Trading day of the naive UTC time `at` (default: now), named after
+        the date it ends on: with a 15:30 Casablanca reset, a 16:00 trade
+        counts toward the next day.
+        """
+        at = (at or datetime.utcnow()).replace(tzinfo=timezone.utc).astimezone(self.reset_tz)
+        day = (at - self.reset_offset).date()
+        return day + timedelta(days=1) if self.reset_offset else day
+
     def evaluate_rules(self, challenge_id):
         """
         The Killer Function - evaluates challenge rules after each trade.
@@ -61,18 +105,17 @@ class ChallengeEngine:
 
         equity = current_balance + position_value
 
-        # Update challenge equity
+        # Roll the day before equity moves: a new day's high starts from the
+        # last equity of the previous day, so a loss on this evaluation counts
+        self._roll_day(challenge, self.trading_day())
+
+        # Update challenge equity (and its equity curve)
         challenge.equity = equity
+        record_snapshots([(challenge.id, equity)])
 
         # ==================== RULE 1: Daily Max Loss ====================
-        # Calculate today's P&L
-        today = date.today()
-        daily_trades = Trade.query.filter(
-            Trade.challenge_id == challenge_id,
-            func.date(Trade.executed_at) == today
-        ).all()
-
-        realized_daily_pnl = sum(float(t.profit or 0) for t in daily_trades)
+        # Today's realized P&L, kept up to date by record_trade
+        realized_daily_pnl = float(challenge.daily_pnl or 0)
 
         # Track daily high equity for drawdown
         if challenge.daily_high_equity is None:
@@ -95,6 +138,7 @@ class ChallengeEngine:
             challenge.status = 'failed'
             challenge.end_date = datetime.utcnow()
             db.session.commit()
+            publish_challenge(challenge)
             return 'failed', f'Daily loss limit exceeded: -{daily_drawdown * 100:.2f}% (max -{config["daily_max_loss"] * 100}%)'
 
         # ==================== RULE 2: Total Max Loss ====================
@@ -104,6 +148,7 @@ class ChallengeEngine:
             challenge.status = 'failed'
             challenge.end_date = datetime.utcnow()
             db.session.commit()
+            publish_challenge(challenge)
             return 'failed', f'Total loss limit exceeded: -{total_drawdown * 100:.2f}% (max -{config["total_max_loss"] * 100}%)'
 
         # ==================== RULE 3: Profit Target ====================
@@ -113,30 +158,137 @@ class ChallengeEngine:
             challenge.status = 'passed'
             challenge.end_date = datetime.utcnow()
             db.session.commit()
+            publish_challenge(challenge)
             return 'passed', f'Profit target reached: +{total_profit_pct * 100:.2f}% (target +{config["profit_target"] * 100}%)'
 
         # ==================== Still Active ====================
         # Update metrics
-        challenge.daily_pnl = realized_daily_pnl
         challenge.total_pnl = equity - initial
 
         db.session.commit()
+        publish_challenge(challenge)
 
         return 'active', f'Challenge continues. P&L: {total_profit_pct * 100:+.2f}%'
 
-    def reset_daily_metrics(self):
+    def record_trade(self, challenge, profit=0):
+        """
+        Count a trade in the challenge's running daily counters and in its
+        day's DailyPnl rollup row (one upsert, no commit). `profit` is the
+        realized P&L of a closing trade.
+        """
+        today = self.trading_day()
+        self._roll_day(challenge, today)
+
+        challenge.daily_pnl = float(challenge.daily_pnl or 0) + profit
+        challenge.daily_trade_count = (challenge.daily_trade_count or 0) + 1
+
+        # Increment in SQL so concurrent workers never lose an update
+        upsert(
+            DailyPnl,
+            [{
+                'challenge_id': challenge.id,
+                'day': today,
+                'realized_pnl': profit,
+                'trade_count': 1
+            }],
+            conflict_columns=['challenge_id', 'day'],
+            update_columns=[],
+            increment_columns=['realized_pnl', 'trade_count']
+        )
+
+    def _roll_day(self, challenge, today):
+        """
+        Point the running counters at `today`. On the first call of a new
+        day they are seeded from the rollup row, which is the source of
+        truth (it may already hold trades written by another worker), and
+        the daily high restarts from the current equity - the same reset
+        reset_daily_metrics applies to challenges that have not traded.
+        """
+        if challenge.pnl_day == today:
+            return
+
+        rollup = DailyPnl.query.filter_by(challenge_id=challenge.id, day=today).first()
+        challenge.pnl_day = today
+        challenge.daily_pnl = float(rollup.realized_pnl) if rollup else 0
+        challenge.daily_trade_count = rollup.trade_count if rollup else 0
+        challenge.daily_high_equity = challenge.equity
+
+    def mark_to_market(self, positions, prices):
+        """
+        Revalue positions at `prices` ({symbol: price dict}) in one
+        vectorized pass. Only positions whose current price or unrealized
+        P&L actually moved are assigned; returns how many changed.
+        """
+        priced = [p for p in positions if p.symbol in prices]
+        if not priced:
+            return 0
+
+        import numpy as np
+
+        price = np.array([prices[p.symbol]['price'] for p in priced], dtype=float)
+        entry = np.array([float(p.entry_price) for p in priced], dtype=float)
+        quantity = np.array([float(p.quantity) for p in priced], dtype=float)
+        # Same precision as the columns, so unchanged values compare equal
+        price = np.round(price, 8)
+        pnl = np.round((price - entry) * quantity, 2)
+
+        changed = 0
+        for p, new_price, new_pnl in zip(priced, price.tolist(), pnl.tolist()):
+            if (p.current_price is None or float(p.current_price) != new_price
+                    or p.unrealized_pnl is None or float(p.unrealized_pnl) != new_pnl):
+                p.current_price = new_price
+                p.unrealized_pnl = new_pnl
+                changed += 1
+
+        return changed
+
+    def reset_daily_metrics(self, batch_size=RESET_BATCH_SIZE):
         """
         Reset daily metrics at the start of each trading day.
         Should be called by a scheduled task.
-        """
-        active_challenges = UserChallenge.query.filter_by(status='active').all()
 
-        for challenge in active_challenges:
-            challenge.daily_pnl = 0
-            challenge.daily_high_equity = challenge.equity
+        One set-based UPDATE per id range of `batch_size` active challenges,
+        each committed on its own. Challenges a trade already rolled into
+        the new day are left alone. Returns the rows touched and duration.
+        """
+        started = time.perf_counter()
+        today = self.trading_day()
+
+        low, high = db.session.query(
+            func.min(UserChallenge.id), func.max(UserChallenge.id)
+        ).filter(UserChallenge.status == 'active').one()
+
+        rows = 0
+        batches = 0
+        if low is not None:
+            for start in range(low, high + 1, batch_size):
+                result = db.session.execute(
+                    update(UserChallenge)
+                    .where(
+                        UserChallenge.id >= start,
+                        UserChallenge.id < start + batch_size,
+                        UserChallenge.status == 'active',
+                        or_(UserChallenge.pnl_day.is_(None), UserChallenge.pnl_day < today)
+                    )
+                    .values(
+                        daily_pnl=0,
+                        daily_trade_count=0,
+                        pnl_day=today,
+                        daily_high_equity=UserChallenge.equity
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+                rows += result.rowcount
+                batches += 1
 
-        db.session.commit()
-        return len(active_challenges)
+        return {
+            'trading_day': today.isoformat(),
+            'market': self.reset_market,
+            'rows': rows,
+            'batches': batches,
+            'ms': round((time.perf_counter() - started) * 1000, 1)
+        }
 
     def get_challenge_metrics(self, challenge_id):
         """Get detailed metrics for a challenge"""
@@ -0,0 +1,176 @@
+"""
+Circuit Breaker
+Per-source circuit breaker with negative caching and latency metrics
+for the upstream market data feeds (yfinance, BVCscrap)
+"""
+
+import threading
+import time
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is +inf
+LATENCY_BUCKETS_MS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (not thread-safe on its own)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, pct):
+        """Upper bound of the bucket holding the pct-th percentile"""
+        if not self.count:
+            return None
+        target = self.count * pct / 100
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self):
+        labels = [f'<={b}ms' for b in self.buckets] + [f'>{self.buckets[-1]}ms']
+        return {
+            'count': self.count,
+            'avg_ms': round(self.total_ms / self.count, 1) if self.count else None,
+            'max_ms': round(self.max_ms, 1),
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one upstream source.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    every call is short-circuited for `reset_timeout` seconds. Then a single
+    probe call is let through (half-open): success closes the breaker,
+    failure opens it again. Independently, a key (symbol) that failed is
+    negatively cached for `negative_ttl` seconds so it is not retried on
+    the very next request.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30, negative_ttl=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.negative_ttl = negative_ttl
+
+        self.state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._negative = {}
+        self._lock = threading.Lock()
+
+        self.latency = LatencyHistogram()
+        self._counters = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'short_circuited': 0,
+            'negative_hits': 0,
+            'opened': 0
+        }
+
+    def allow(self, key=None):
+        """Return True if a call for `key` may go upstream right now"""
+        now = time.monotonic()
+
+        with self._lock:
+            if key is not None:
+                failed_at = self._negative.get(key)
+                if failed_at is not None:
+                    if now - failed_at < self.negative_ttl:
+                        self._counters['negative_hits'] += 1
+                        return False
+                    del self._negative[key]
+
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    self._counters['short_circuited'] += 1
+                    return False
+                self.state = self.HALF_OPEN
+
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    self._counters['short_circuited'] += 1
+                    return False
+                self._probe_in_flight = True
+
+            self._counters['calls'] += 1
+            return True
+
+    def record_success(self, elapsed_ms, key=None):
+        with self._lock:
+            self.latency.observe(elapsed_ms)
+            self._counters['successes'] += 1
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+            self.state = self.CLOSED
+            if key is not None:
+                self._negative.pop(key, None)
+
+    def record_failure(self, elapsed_ms, key=None, trip=True):
+        """
+        Record a failed call. `trip=False` only negatively caches the key
+        (e.g. an unknown symbol) without counting against the source.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self.latency.observe(elapsed_ms)
+            if key is not None:
+                self._negative[key] = now
+
+            if not trip:
+                if self.state == self.HALF_OPEN:
+                    self._probe_in_flight = False
+                return
+
+            self._counters['failures'] += 1
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+
+            if self.state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self._counters['opened'] += 1
+                self.state = self.OPEN
+                self._opened_at = now
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self._consecutive_failures,
+                'open_for_s': round(max(0, self.reset_timeout - (now - self._opened_at)), 1)
+                if self.state == self.OPEN else 0,
+                'negative_cached': sum(
+                    1 for t in self._negative.values() if now - t < self.negative_ttl
+                ),
+                **self._counters,
+                'latency': self.latency.to_dict()
+            }
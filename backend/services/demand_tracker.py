@@ -0,0 +1,168 @@
+"""
+Demand Tracker
+Decides which symbols the price refresh job fetches on each tick, from what
+users are actually watching (quotes, charts, streams) and holding
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from models import MarketData, PendingOrder, Position, SymbolDemand, UserChallenge, db
+from services.bulk_upsert import upsert
+
+# A quote / chart / stream request keeps a symbol hot for this long (seconds)
+DEMAND_HOT_SECONDS = 300
+# Symbols nobody asked about for this long drop out of the refreshed universe
+DEMAND_RETENTION_SECONDS = 86400
+# Each worker writes a symbol's demand row at most this often (seconds)
+DEMAND_WRITE_INTERVAL = 30
+
+
+class DemandTracker:
+    """
+    Hot / idle classification of symbols, shared by all workers via the DB.
+
+    A symbol is hot while it is held in an active challenge's open position,
+    has a pending order, or was requested in the last `hot_seconds`; hot symbols are refreshed on
+    every tick, idle ones only every `idle_interval`. Requests are recorded
+    in `symbol_demand`, throttled per worker so a busy symbol costs one small
+    write every DEMAND_WRITE_INTERVAL seconds rather than one per request.
+    Only symbols the platform lists or has served a real quote for are
+    recorded, so arbitrary request paths cannot grow the refresh universe.
+    """
+
+    def __init__(self, hot_seconds=DEMAND_HOT_SECONDS,
+                 retention_seconds=DEMAND_RETENTION_SECONDS,
+                 write_interval=DEMAND_WRITE_INTERVAL):
+        self.hot_seconds = hot_seconds
+        self.retention_seconds = retention_seconds
+        self.write_interval = write_interval
+        self._written_at = {}
+        self._lock = threading.Lock()
+        self._last_plan = {}
+
+    def record(self, symbol, market, source='quote', existing_only=False):
+        """
+        Note that a user asked for `symbol` (commits its own write). With
+        `existing_only`, only renew a symbol that was recorded before.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now - self._written_at.get(symbol, float('-inf')) < self.write_interval:
+                return
+            self._written_at[symbol] = now
+
+        try:
+            if existing_only:
+                SymbolDemand.query.filter_by(symbol=symbol).update({
+                    'source': source,
+                    'last_requested_at': datetime.utcnow()
+                })
+                db.session.commit()
+                return
+
+            upsert(
+                SymbolDemand,
+                [{
+                    'symbol': symbol,
+                    'market': market,
+                    'source': source,
+                    'last_requested_at': datetime.utcnow()
+                }],
+                conflict_columns=['symbol'],
+                update_columns=['source', 'last_requested_at']
+            )
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Could not record demand for {symbol}: {e}")
+
+    def hot_symbols(self):
+        """Symbols in open positions, pending orders or requested within the hot window"""
+        since = datetime.utcnow() - timedelta(seconds=self.hot_seconds)
+
+        held = db.session.query(Position.symbol).join(
+            UserChallenge, Position.challenge_id == UserChallenge.id
+        ).filter(UserChallenge.status == 'active').distinct()
+
+        ordered = db.session.query(PendingOrder.symbol).filter(
+            PendingOrder.status == 'pending'
+        ).distinct()
+
+        viewed = db.session.query(SymbolDemand.symbol).filter(
+            SymbolDemand.last_requested_at >= since
+        )
+
+        return {row[0] for row in held} | {row[0] for row in ordered} | {row[0] for row in viewed}
+
+    def in_universe(self, symbol, tracked):
+        """Whether the refresh job currently fetches `symbol` (see due_symbols)"""
+        if symbol in tracked:
+            return True
+
+        retained_since = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        requested = db.session.query(SymbolDemand.symbol).filter(
+            SymbolDemand.symbol == symbol,
+            SymbolDemand.last_requested_at >= retained_since
+        ).first()
+        if requested:
+            return True
+
+        held = db.session.query(Position.id).join(
+            UserChallenge, Position.challenge_id == UserChallenge.id
+        ).filter(Position.symbol == symbol, UserChallenge.status == 'active').first()
+        if held:
+            return True
+
+        return db.session.query(PendingOrder.id).filter(
+            PendingOrder.symbol == symbol,
+            PendingOrder.status == 'pending'
+        ).first() is not None
+
+    def due_symbols(self, tracked, hot_interval, idle_interval):
+        """
+        Symbols to fetch on this tick of a job running every `hot_interval`.
+
+        The universe is `tracked` plus anything requested within the
+        retention window. A symbol is due when its cached row is older than
+        its interval, with half a tick of slack for scheduling jitter.
+        """
+        now = datetime.utcnow()
+        retained_since = now - timedelta(seconds=self.retention_seconds)
+
+        requested = {
+            row[0] for row in db.session.query(SymbolDemand.symbol).filter(
+                SymbolDemand.last_requested_at >= retained_since
+            )
+        }
+        hot = self.hot_symbols()
+        universe = set(tracked) | requested | hot
+
+        updated = dict(db.session.query(MarketData.symbol, MarketData.last_updated).filter(
+            MarketData.symbol.in_(universe)
+        ))
+
+        due = []
+        slack = hot_interval / 2
+        for symbol in sorted(universe):
+            interval = hot_interval if symbol in hot else idle_interval
+            last_updated = updated.get(symbol)
+            if last_updated is None or (now - last_updated).total_seconds() + slack >= interval:
+                due.append(symbol)
+
+        with self._lock:
+            self._last_plan = {
+                'planned_at': now.isoformat(),
+                'universe': len(universe),
+                'hot': len(hot & universe),
+                'due': len(due)
+            }
+        return due
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hot_seconds': self.hot_seconds,
+                'retention_seconds': self.retention_seconds,
+                'last_plan': dict(self._last_plan)
+            }
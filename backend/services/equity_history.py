@@ -0,0 +1,155 @@
+"""
+Equity History
+Append-only equity snapshots per challenge, compacted into minute, hour and
+day buckets as they age, and read back as a downsampled equity curve
+"""
+
+from datetime import datetime, timedelta
+from itertools import groupby
+from sqlalchemy import delete, func, select
+from models import EquitySnapshot, db
+
+# (source, target, bucket width, age at which source points are folded)
+COMPACTION_LEVELS = (
+    ('raw', 'minute', timedelta(minutes=1), timedelta(hours=1)),
+    ('minute', 'hour', timedelta(hours=1), timedelta(days=2)),
+    ('hour', 'day', timedelta(days=1), timedelta(days=30)),
+)
+
+# Challenges compacted per transaction
+COMPACT_BATCH_SIZE = 1000
+
+# Points returned by equity_curve() by default / at most
+CURVE_POINTS = 200
+CURVE_MAX_POINTS = 1000
+
+
+def _floor(at, width):
+    """Start of the `width`-sized bucket containing `at`"""
+    return datetime.min + ((at - datetime.min) // width) * width
+
+
+def record_snapshots(points, at=None):
+    """
+    Append raw snapshots for `points` ([(challenge_id, equity), ...]) in
+    the current transaction; the caller commits.
+    """
+    if not points:
+        return 0
+
+    at = at or datetime.utcnow()
+    db.session.execute(EquitySnapshot.__table__.insert(), [
+        {
+            'challenge_id': challenge_id,
+            'resolution': 'raw',
+            'bucket_at': at,
+            'open_equity': equity,
+            'high_equity': equity,
+            'low_equity': equity,
+            'close_equity': equity,
+            'samples': 1
+        }
+        for challenge_id, equity in points
+    ])
+    return len(points)
+
+
+def _fold(rows, resolution, bucket_of):
+    """Merge time-ordered OHLC rows sharing (challenge, bucket) into one row each"""
+    buckets = []
+    for (challenge_id, bucket_at), group in groupby(
+        rows, key=lambda row: (row.challenge_id, bucket_of(row.bucket_at))
+    ):
+        group = list(group)
+        buckets.append({
+            'challenge_id': challenge_id,
+            'resolution': resolution,
+            'bucket_at': bucket_at,
+            'open_equity': float(group[0].open_equity),
+            'high_equity': max(float(row.high_equity) for row in group),
+            'low_equity': min(float(row.low_equity) for row in group),
+            'close_equity': float(group[-1].close_equity),
+            'samples': sum(row.samples for row in group)
+        })
+    return buckets
+
+
+def compact_snapshots(now=None, batch_size=COMPACT_BATCH_SIZE):
+    """
+    Fold aged points into coarser buckets, level by level.
+
+    The cutoff of each level is aligned to its bucket width, so a bucket is
+    only written once all of its source points have aged out and it never
+    needs merging with a later run. Works through challenges in id ranges,
+    inserting the buckets and deleting their sources in one transaction
+    per range. Returns {target: {'folded': n, 'buckets': n}}.
+    """
+    now = now or datetime.utcnow()
+    table = EquitySnapshot.__table__
+    report = {}
+
+    for source, target, width, age in COMPACTION_LEVELS:
+        cutoff = _floor(now - age, width)
+        aged = (table.c.resolution == source, table.c.bucket_at < cutoff)
+        folded = written = 0
+
+        low, high = db.session.execute(
+            select(func.min(table.c.challenge_id), func.max(table.c.challenge_id)).where(*aged)
+        ).one()
+
+        if low is not None:
+            for start in range(low, high + 1, batch_size):
+                in_range = aged + (
+                    table.c.challenge_id >= start,
+                    table.c.challenge_id < start + batch_size
+                )
+                rows = db.session.execute(
+                    select(table).where(*in_range).order_by(table.c.challenge_id, table.c.bucket_at)
+                ).all()
+                buckets = _fold(rows, target, lambda at: _floor(at, width))
+                if buckets:
+                    db.session.execute(table.insert(), buckets)
+                db.session.execute(delete(table).where(*in_range))
+                db.session.commit()
+
+                folded += len(rows)
+                written += len(buckets)
+
+        report[target] = {'folded': folded, 'buckets': written}
+
+    return report
+
+
+def equity_curve(challenge_id, start, end, points=CURVE_POINTS):
+    """
+    Equity buckets of a challenge between `start` and `end`, merged down to
+    at most `points` equal-width buckets, with the peak and the largest
+    peak-to-trough drawdown over the range.
+    """
+    rows = EquitySnapshot.query.filter(
+        EquitySnapshot.challenge_id == challenge_id,
+        EquitySnapshot.bucket_at >= start,
+        EquitySnapshot.bucket_at <= end
+    ).order_by(EquitySnapshot.bucket_at, EquitySnapshot.id).all()
+
+    if len(rows) > points:
+        width = (end - start) / points
+        rows = [
+            EquitySnapshot(**bucket)
+            for bucket in _fold(
+                rows, 'downsampled',
+                lambda at: start + ((at - start) // width) * width
+            )
+        ]
+
+    peak = None
+    max_drawdown = 0.0
+    for row in rows:
+        peak = max(peak or 0.0, float(row.high_equity))
+        max_drawdown = max(max_drawdown, (peak - float(row.low_equity)) / peak)
+
+    return {
+        'points': [row.to_dict() for row in rows],
+        'peak_equity': peak,
+        'max_drawdown_pct': round(max_drawdown * 100, 2)
+    }
@@ -0,0 +1,191 @@
+"""
+History Store
+Local columnar OHLCV candle store per (symbol, interval)
+"""
+
+import json
+import os
+import threading
+import time
+
+# numpy and pandas are imported on first use to keep worker boot fast
+
+# Row order of the on-disk (6, n) array; each row is one contiguous column
+COLUMNS = ('time', 'open', 'high', 'low', 'close', 'volume')
+
+DEFAULT_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'history'
+)
+
+INTERVAL_SECONDS = {
+    '1m': 60, '2m': 120, '5m': 300, '15m': 900, '30m': 1800,
+    '60m': 3600, '90m': 5400, '1h': 3600,
+    '1d': 86400, '5d': 5 * 86400, '1wk': 7 * 86400,
+    '1mo': 30 * 86400, '3mo': 90 * 86400
+}
+
+PERIOD_DAYS = {
+    '1d': 1, '5d': 5, '1mo': 30, '3mo': 90, '6mo': 182,
+    '1y': 365, '2y': 730, '5y': 1825, '10y': 3650, 'max': 36500
+}
+
+# Date column spellings used by yfinance (daily / intraday) and BVCscrap
+TIME_ALIASES = ('date', 'datetime', 'seance', 'index')
+
+
+def frame_to_columns(frame):
+    """
+    Normalise an upstream OHLCV DataFrame into sorted float64 columns.
+
+    Column names are matched case-insensitively, timestamps become UTC epoch
+    seconds (naive dates are taken as UTC), rows without a time or close are
+    dropped and duplicate timestamps keep the last bar.
+    """
+    if frame is None or frame.empty:
+        return None
+
+    import numpy as np
+    import pandas as pd
+
+    frame = frame.reset_index()
+    frame.columns = [str(c).lower() for c in frame.columns]
+
+    time_col = next((c for c in TIME_ALIASES if c in frame.columns), None)
+    if time_col is None or 'close' not in frame.columns:
+        return None
+
+    times = pd.to_datetime(frame[time_col], utc=True, errors='coerce')
+    epoch = (times - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1)
+
+    out = pd.DataFrame({'time': epoch})
+    for name in COLUMNS[1:]:
+        if name in frame.columns:
+            out[name] = pd.to_numeric(frame[name], errors='coerce')
+        else:
+            out[name] = 0.0 if name == 'volume' else np.nan
+
+    out = out.dropna(subset=['time', 'close'])
+    for name in ('open', 'high', 'low'):
+        out[name] = out[name].fillna(out['close'])
+    out['volume'] = out['volume'].fillna(0.0)
+
+    out = out.sort_values('time', kind='stable').drop_duplicates('time', keep='last')
+    if out.empty:
+        return None
+
+    return np.ascontiguousarray(out[list(COLUMNS)].to_numpy(dtype=np.float64).T)
+
+
+class HistoryStore:
+    """
+    On-disk candle store, one uncompressed `.npy` file per (symbol, interval).
+
+    Each file holds a (6, n) float64 array whose rows are the COLUMNS, so a
+    column is a contiguous strip that can be memory-mapped and sliced without
+    reading the rest. A JSON sidecar records how far back the data is
+    complete and when upstream was last asked for new bars. Writes go to a
+    temp file followed by os.replace, so concurrent readers (other gunicorn
+    workers included) always see a whole file.
+    """
+
+    def __init__(self, root=None, namespace=None):
+        self.root = root or os.environ.get('HISTORY_STORE_DIR', DEFAULT_ROOT)
+        if namespace:
+            # Keep e.g. replayed candles apart from live ones
+            self.root = os.path.join(self.root, namespace)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def lock(self, symbol, interval):
+        """Per-key lock so one thread at a time fetches and appends"""
+        key = (symbol, interval)
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _path(self, symbol, interval):
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f'Unknown interval {interval!r}')
+        safe_symbol = symbol.upper().replace('/', '_').replace('\\', '_')
+        if safe_symbol in ('', '.', '..'):
+            raise ValueError(f'Invalid symbol {symbol!r}')
+        return os.path.join(self.root, safe_symbol, f'{interval}.npy')
+
+    def _meta_path(self, symbol, interval):
+        return self._path(symbol, interval)[:-len('.npy')] + '.json'
+
+    def load(self, symbol, interval):
+        """Return (columns, meta) with columns memory-mapped, or (None, None)"""
+        import numpy as np
+
+        path = self._path(symbol, interval)
+        try:
+            columns = np.load(path, mmap_mode='r')
+            with open(self._meta_path(symbol, interval)) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None, None
+
+        if columns.ndim != 2 or columns.shape[0] != len(COLUMNS):
+            return None, None
+        return columns, meta
+
+    def write(self, symbol, interval, columns, coverage_start):
+        """Replace the stored candles for a key"""
+        import numpy as np
+
+        path = self._path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.ascontiguousarray(columns, dtype=np.float64))
+        os.replace(tmp_path, path)
+
+        self._write_meta(symbol, interval, {
+            'coverage_start': coverage_start,
+            'fetched_at': time.time()
+        })
+
+    def append(self, symbol, interval, new_columns):
+        """
+        Merge newer candles into the stored ones.
+
+        Stored bars at or after the first new bar are replaced, since the
+        last stored bar is usually still forming when it is fetched.
+        """
+        import numpy as np
+
+        columns, meta = self.load(symbol, interval)
+        if columns is None:
+            return
+
+        if new_columns is not None and new_columns.shape[1]:
+            keep = np.searchsorted(columns[0], new_columns[0, 0], side='left')
+            merged = np.concatenate([np.asarray(columns[:, :keep]), new_columns], axis=1)
+            self.write(symbol, interval, merged, meta['coverage_start'])
+        else:
+            self.touch(symbol, interval)
+
+    def touch(self, symbol, interval):
+        """Record that upstream was checked even though nothing changed"""
+        _, meta = self.load(symbol, interval)
+        if meta is not None:
+            meta['fetched_at'] = time.time()
+            self._write_meta(symbol, interval, meta)
+
+    def _write_meta(self, symbol, interval, meta):
+        path = self._meta_path(symbol, interval)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def slice_since(columns, start):
+        """View of the candles with time >= start (epoch seconds)"""
+        import numpy as np
+
+        first = np.searchsorted(columns[0], start, side='left')
+        return columns[:, first:]
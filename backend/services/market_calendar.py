@@ -0,0 +1,146 @@
+"""
+Market Calendar
+Trading sessions, weekends and holidays per market (US, Casablanca, crypto)
+"""
+
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# NYSE / NASDAQ full-day closures
+US_HOLIDAYS = (
+    '2025-01-01', '2025-01-20', '2025-02-17', '2025-04-18', '2025-05-26',
+    '2025-06-19', '2025-07-04', '2025-09-01', '2025-11-27', '2025-12-25',
+    '2026-01-01', '2026-01-19', '2026-02-16', '2026-04-03', '2026-05-25',
+    '2026-06-19', '2026-07-03', '2026-09-07', '2026-11-26', '2026-12-25',
+    '2027-01-01', '2027-01-18', '2027-02-15', '2027-03-26', '2027-05-31',
+    '2027-06-18', '2027-07-05', '2027-09-06', '2027-11-25', '2027-12-24'
+)
+
+# Fixed-date Moroccan public holidays (month, day), closed every year
+MOROCCO_FIXED_HOLIDAYS = (
+    (1, 1), (1, 11), (1, 14), (5, 1), (7, 30),
+    (8, 14), (8, 20), (8, 21), (11, 6), (11, 18)
+)
+
+# How far back last_close() looks for a trading day
+MAX_LOOKBACK_DAYS = 14
+
+
+def _parse_dates(values):
+    return {date.fromisoformat(v.strip()) for v in values if v.strip()}
+
+
+class MarketCalendar:
+    """
+    One daily session in the market's local time, Monday to Friday, minus
+    holidays. Times in and out are naive UTC datetimes, like the rest of
+    the backend.
+    """
+
+    always_open = False
+
+    def __init__(self, name, tz, open_time, close_time, holidays=(), yearly_holidays=()):
+        self.name = name
+        self.tz = ZoneInfo(tz)
+        self.open_time = open_time
+        self.close_time = close_time
+        self.holidays = set(holidays)
+        self.yearly_holidays = set(yearly_holidays)
+
+    def is_trading_day(self, day):
+        return (
+            day.weekday() < 5
+            and day not in self.holidays
+            and (day.month, day.day) not in self.yearly_holidays
+        )
+
+    def _to_utc(self, day, at_time):
+        local = datetime.combine(day, at_time, tzinfo=self.tz)
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+    def _local_day(self, at):
+        return at.replace(tzinfo=timezone.utc).astimezone(self.tz).date()
+
+    def is_open(self, at=None):
+        at = at or datetime.utcnow()
+        day = self._local_day(at)
+        return (
+            self.is_trading_day(day)
+            and self._to_utc(day, self.open_time) <= at < self._to_utc(day, self.close_time)
+        )
+
+    def last_close(self, at=None):
+        """End of the most recent session that finished at or before `at`"""
+        at = at or datetime.utcnow()
+        day = self._local_day(at)
+        for _ in range(MAX_LOOKBACK_DAYS):
+            if self.is_trading_day(day):
+                close = self._to_utc(day, self.close_time)
+                if close <= at:
+                    return close
+            day -= timedelta(days=1)
+        return None
+
+    def next_open(self, at=None):
+        """Start of the next session after `at` (or of the current one)"""
+        at = at or datetime.utcnow()
+        day = self._local_day(at)
+        for _ in range(MAX_LOOKBACK_DAYS):
+            if self.is_trading_day(day):
+                opens = self._to_utc(day, self.open_time)
+                if opens > at or self.is_open(at):
+                    return opens
+            day += timedelta(days=1)
+        return None
+
+    def status(self, at=None):
+        at = at or datetime.utcnow()
+        last_close = self.last_close(at)
+        next_open = self.next_open(at)
+        return {
+            'market': self.name,
+            'open': self.is_open(at),
+            'last_close': last_close.isoformat() if last_close else None,
+            'next_open': next_open.isoformat() if next_open else None
+        }
+
+
+class AlwaysOpenCalendar(MarketCalendar):
+    """Crypto trades around the clock"""
+
+    always_open = True
+
+    def __init__(self, name):
+        self.name = name
+
+    def is_open(self, at=None):
+        return True
+
+    def last_close(self, at=None):
+        return None
+
+    def next_open(self, at=None):
+        return None
+
+
+def build_calendars():
+    """
+    Calendars per market. Holidays that move every year (Islamic holidays
+    in Morocco, new exchange closures) are added through
+    MARKET_HOLIDAYS_US / MARKET_HOLIDAYS_MOROCCO as comma-separated dates.
+    """
+    return {
+        'us': MarketCalendar(
+            'us', 'America/New_York', time(9, 30), time(16, 0),
+            holidays=_parse_dates(US_HOLIDAYS + tuple(
+                os.environ.get('MARKET_HOLIDAYS_US', '').split(',')
+            ))
+        ),
+        'morocco': MarketCalendar(
+            'morocco', 'Africa/Casablanca', time(9, 30), time(15, 30),
+            holidays=_parse_dates(os.environ.get('MARKET_HOLIDAYS_MOROCCO', '').split(',')),
+            yearly_holidays=MOROCCO_FIXED_HOLIDAYS
+        ),
+        'crypto': AlwaysOpenCalendar('crypto')
+    }
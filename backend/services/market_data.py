@@ -1,11 +1,21 @@
 """
 Market Data Service
-Integrates yfinance (US/Crypto) and BVCscrap (Morocco)
+Integrates yfinance (US/Crypto) and BVCscrap (Morocco) through pluggable providers
 """
 
-import yfinance as yf
-from datetime import datetime, timedelta
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
 from models import MarketData, db
+from services.bulk_upsert import upsert
+from services.circuit_breaker import CircuitBreaker
+from services.history_store import HistoryStore, frame_to_columns, INTERVAL_SECONDS, PERIOD_DAYS
+from services.market_calendar import build_calendars
+from services.price_cache import PriceCache, SingleFlight
+from services.providers import build_providers, YFINANCE_BATCH_TIMEOUT
+from services.shared_prices import SharedPriceTable
+from services.stream_hub import publish_price
 
 # Morocco stocks mapping
 MOROCCO_SYMBOLS = {
@@ -23,106 +33,350 @@ US_SYMBOLS = ['AAPL', 'TSLA', 'GOOGL', 'MSFT', 'AMZN', 'META', 'NVDA']
 # Crypto symbols
 CRYPTO_SYMBOLS = ['BTC-USD', 'ETH-USD', 'SOL-USD', 'BNB-USD']
 
+# Batched refresh settings (seconds / threads). Providers without a batch
+# API (BVCscrap) are fetched one symbol per thread.
+BATCH_FETCH_TIMEOUT = YFINANCE_BATCH_TIMEOUT
+SYMBOL_FETCH_TIMEOUT = 20
+SYMBOL_FETCH_MAX_WORKERS = 4
+
+# In-process price cache (seconds / entries)
+PRICE_CACHE_TTL = 30
+PRICE_CACHE_MAX_STALE = 300
+PRICE_CACHE_SIZE = 512
+
+# Upstream circuit breakers: consecutive failures before opening,
+# seconds before a half-open probe, seconds a failed symbol is not retried
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_RESET_TIMEOUT = 30
+BREAKER_NEGATIVE_TTL = 30
+
+# How often the candle store asks upstream for newer bars (seconds)
+HISTORY_MIN_REFETCH = 60
+HISTORY_MAX_REFETCH = 900
+
+# Daily-bar quotes (BVCscrap): store period, and how old the last bar may get
+# during a session before the missing days are fetched (seconds)
+DAILY_QUOTE_PERIOD = '1mo'
+DAILY_QUOTE_REFETCH = 300
+
+
+def _quote_time(price_data):
+    """When a quote was taken (naive UTC), from its ISO timestamp"""
+    try:
+        return datetime.fromisoformat(price_data['timestamp'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
 
 class MarketDataService:
     """Service for fetching market data from multiple sources"""
 
     def __init__(self):
-        self.cache = {}
-        self.cache_duration = 30  # seconds
+        self.cache_duration = PRICE_CACHE_TTL  # seconds
+        self.cache = PriceCache(
+            max_size=PRICE_CACHE_SIZE,
+            ttl=self.cache_duration,
+            max_stale=PRICE_CACHE_MAX_STALE
+        )
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        # Concurrent misses for one symbol share a single upstream fetch
+        self.single_flight = SingleFlight()
+        # Optional cross-worker table (set SHARED_PRICE_TABLE=/dev/shm/...)
+        self.shared = SharedPriceTable.from_env()
+        # market -> provider (yfinance / BVCscrap, or replay for load tests)
+        self.providers = build_providers()
+        # market -> trading calendar (closed markets are served their close)
+        self.calendars = build_calendars()
+        replay = any(p.name == 'replay' for p in self.providers.values())
+        self.history = HistoryStore(namespace='replay' if replay else None)
+        self.breakers = {
+            provider.name: CircuitBreaker(
+                provider.name,
+                failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=BREAKER_RESET_TIMEOUT,
+                negative_ttl=BREAKER_NEGATIVE_TTL
+            )
+            for provider in self.providers.values()
+        }
+        # Callbacks run with {symbol: price} after each refresh is committed
+        self.price_listeners = []
+        self._unnotified = {}
 
     def get_price(self, symbol):
-        """Get price for any symbol"""
+        """
+        Get price for any symbol.
+
+        Served from the in-process cache when possible, then from the
+        shared price table written by another worker. A stale entry is
+        returned immediately while a background thread refetches it.
+        While the symbol's market is closed, a quote taken after the last
+        close is served however old it is.
+        """
+        symbol = symbol.upper()
+        return self._get_cached_price(symbol) or self._fetch_and_store(symbol)
+
+    def get_prices(self, symbols):
+        """
+        Get prices for many symbols at once ({symbol: price dict}).
+
+        Each symbol is first looked up like get_price (closing price, local
+        cache, shared table, stale entry); the misses are fetched together
+        through fetch_all_prices, i.e. one batch download per provider
+        instead of one sequential request per symbol.
+        """
+        prices = {}
+        missing = []
+        for symbol in dict.fromkeys(s.upper() for s in symbols):
+            price_data = self._get_cached_price(symbol)
+            if price_data:
+                prices[symbol] = price_data
+            else:
+                missing.append(symbol)
+
+        if missing:
+            for symbol, price_data in self.fetch_all_prices(missing).items():
+                self._store_price(symbol, price_data)
+                prices[symbol] = price_data
+
+        return prices
+
+    def _get_cached_price(self, symbol):
+        """Quote that needs no upstream call right now, or None"""
+        market = self.resolve_symbol(symbol)[1]
+        if self.is_market_closed(market):
+            closing_data = self._get_closing_price(symbol, market)
+            if closing_data:
+                return closing_data
+
+        price_data, state = self.cache.get(symbol)
+        if state == PriceCache.FRESH:
+            return price_data
+
+        shared_data = self._get_shared_price(symbol)
+        if shared_data:
+            self.cache.set(symbol, shared_data)
+            return shared_data
+
+        if state == PriceCache.STALE:
+            self._refresh_in_background(symbol)
+            return price_data
+
+        return None
+
+    def _fetch_and_store(self, symbol):
+        """Fetch a symbol once no matter how many threads ask at the same time"""
+        def fetch():
+            price_data = self._fetch_price(symbol)
+            if price_data:
+                self._store_price(symbol, price_data)
+            return price_data
+
+        return self.single_flight.do(symbol, fetch)
+
+    def _get_shared_price(self, symbol):
+        """Fresh quote from the shared price table, if enabled"""
+        if not self.shared:
+            return None
+
+        price_data, updated_at = self.shared.get(symbol)
+        if price_data and time.time() - updated_at <= self.cache_duration:
+            return price_data
+        return None
+
+    # ==================== Market hours ====================
+
+    def is_market_closed(self, market):
+        """True while the market's exchange is outside its trading session"""
+        if not self.providers[market].follows_calendar:
+            return False
+        return not self.calendars[market].is_open()
+
+    def has_closing_price(self, market, updated_at):
+        """True if the market is closed and `updated_at` (UTC) is after its last close"""
+        if updated_at is None or not self.is_market_closed(market):
+            return False
+        last_close = self.calendars[market].last_close()
+        return last_close is not None and updated_at >= last_close
+
+    def _get_closing_price(self, symbol, market):
+        """Last close from the local cache, the shared table or the DB row"""
+        price_data, _ = self.cache.get(symbol, max_stale=float('inf'))
+        if price_data and self.has_closing_price(market, _quote_time(price_data)):
+            return price_data
+
+        if self.shared:
+            shared_data, updated_at = self.shared.get(symbol)
+            if shared_data and self.has_closing_price(market, datetime.utcfromtimestamp(updated_at)):
+                self.cache.set(symbol, shared_data)
+                return shared_data
+
+        row = MarketData.query.filter_by(symbol=symbol).first()
+        if row and self.has_closing_price(market, row.last_updated):
+            price_data = dict(row.to_dict(), timestamp=row.last_updated.isoformat())
+            self.cache.set(symbol, price_data)
+            return price_data
+
+        return None
+
+    def get_market_hours(self):
+        """Open / closed state, last close and next open per market"""
+        return {market: calendar.status() for market, calendar in self.calendars.items()}
+
+    def _store_price(self, symbol, price_data):
+        """Put a fetched quote in the local cache and publish it to other workers"""
+        self.cache.set(symbol, price_data)
+        if self.shared:
+            self.shared.put(dict(price_data, symbol=symbol))
+        # Push the tick to this worker's /stream subscribers
+        publish_price(dict(price_data, symbol=symbol))
+
+    def _fetch_price(self, symbol):
+        """Fetch a live price from the upstream source for the symbol"""
+        symbol, market = self.resolve_symbol(symbol)
+        return self.get_provider_price(symbol, market)
+
+    def resolve_symbol(self, symbol):
+        """Return (normalized symbol, market) for any symbol"""
         symbol = symbol.upper()
 
         # Determine market type
         if symbol in MOROCCO_SYMBOLS:
-            return self.get_morocco_price(symbol)
+            return symbol, 'morocco'
         elif symbol.endswith('-USD') or symbol in ['BTC', 'ETH', 'SOL', 'BNB']:
             # Normalize crypto symbols
             if not symbol.endswith('-USD'):
                 symbol = f"{symbol}-USD"
-            return self.get_yfinance_price(symbol, 'crypto')
+            return symbol, 'crypto'
         else:
-            return self.get_yfinance_price(symbol, 'us')
-
-    def get_yfinance_price(self, symbol, market='us'):
-        """Get price from Yahoo Finance (US stocks & Crypto)"""
+            return symbol, 'us'
+
+    def _refresh_in_background(self, symbol):
+        """Refetch a stale symbol on a daemon thread (one at a time per symbol)"""
+        with self._refresh_lock:
+            if symbol in self._refreshing:
+                return
+            self._refreshing.add(symbol)
+
+        def refresh():
+            try:
+                self._fetch_and_store(symbol)
+            except Exception as e:
+                print(f"Background price refresh error for {symbol}: {e}")
+            finally:
+                with self._refresh_lock:
+                    self._refreshing.discard(symbol)
+
+        threading.Thread(target=refresh, name=f'price-refresh-{symbol}', daemon=True).start()
+
+    def get_cache_stats(self):
+        """Hit/miss/stale counters of the in-process and shared price caches"""
+        stats = self.cache.stats()
+        with self._refresh_lock:
+            stats['refreshing'] = len(self._refreshing)
+        stats['single_flight'] = self.single_flight.stats()
+        stats['shared'] = self.shared.stats() if self.shared else None
+        return stats
+
+    def get_source_stats(self):
+        """Circuit breaker state, error counters and latency per upstream source"""
+        return {source: breaker.stats() for source, breaker in self.breakers.items()}
+
+    def get_provider_price(self, symbol, market):
+        """Get price for one symbol from its market's provider"""
+        provider = self.providers[market]
+        if provider.daily_bar_quotes:
+            return self._get_daily_bar_quote(symbol, market, provider)
+
+        breaker = self.breakers[provider.name]
+
+        # Breaker open or symbol failed recently: don't wait on upstream again
+        if not breaker.allow(symbol):
+            return self._get_fallback(symbol, market, provider)
+
+        started = time.monotonic()
         try:
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period='1d', interval='1m')
-
-            if data.empty:
-                # Try with longer period
-                data = ticker.history(period='5d', interval='1d')
-
-            if not data.empty:
-                current_price = float(data['Close'].iloc[-1])
-                open_price = float(data['Open'].iloc[0])
-                high_price = float(data['High'].max())
-                low_price = float(data['Low'].min())
-                volume = float(data['Volume'].sum())
-                change_pct = ((current_price - open_price) / open_price) * 100
-
-                return {
-                    'symbol': symbol,
-                    'market': market,
-                    'price': round(current_price, 2 if market == 'us' else 8),
-                    'open': round(open_price, 2),
-                    'high': round(high_price, 2),
-                    'low': round(low_price, 2),
-                    'change_percent': round(change_pct, 2),
-                    'volume': volume,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
+            quote = provider.get_quote(symbol, market)
+            elapsed_ms = (time.monotonic() - started) * 1000
+            if quote:
+                breaker.record_success(elapsed_ms, key=symbol)
+                return quote
+            # Upstream answered but has no data for this symbol
+            breaker.record_failure(elapsed_ms, key=symbol, trip=False)
+        except ImportError:
+            print(f"{provider.name} not installed, using fallback data")
+            breaker.record_failure(0, key=symbol, trip=False)
         except Exception as e:
-            print(f"yfinance error for {symbol}: {e}")
-
-        # Return fallback data if yfinance fails
-        return self._get_fallback_price(symbol, market)
+            breaker.record_failure((time.monotonic() - started) * 1000, key=symbol)
+            print(f"{provider.name} error for {symbol}: {e}")
+
+        return self._get_fallback(symbol, market, provider)
+
+    def _get_daily_bar_quote(self, symbol, market, provider):
+        """
+        Quote from the last bar of the local daily-bar store. Upstream is
+        only asked for the days after the last stored bar, and only once the
+        store is DAILY_QUOTE_REFETCH seconds old.
+        """
+        columns = self.get_historical_columns(
+            symbol, DAILY_QUOTE_PERIOD, '1d', refetch_after=DAILY_QUOTE_REFETCH
+        )
+        if columns is None or not columns.shape[1]:
+            return self._get_fallback(symbol, market, provider)
+
+        _, open_price, high_price, low_price, current_price, volume = (
+            float(value) for value in columns[:, -1]
+        )
+        change_pct = ((current_price - open_price) / open_price) * 100 if open_price else 0
 
-    def get_morocco_price(self, symbol):
-        """Get price for Moroccan stocks from BVCscrap"""
-        try:
-            # Try importing BVCscrap
-            from BVCscrap import LoadData
-
-            end = datetime.now()
-            start = end - timedelta(days=10)
-
-            data = LoadData(
-                symbol,
-                start.strftime('%Y-%m-%d'),
-                end.strftime('%Y-%m-%d')
-            )
-
-            if data is not None and not data.empty:
-                current_price = float(data['close'].iloc[-1])
-                open_price = float(data['open'].iloc[-1])
-                high_price = float(data['high'].iloc[-1])
-                low_price = float(data['low'].iloc[-1])
-                volume = float(data['volume'].iloc[-1]) if 'volume' in data.columns else 0
-                change_pct = ((current_price - open_price) / open_price) * 100
+        return {
+            'symbol': symbol,
+            'market': market,
+            'price': round(current_price, 2),
+            'open': round(open_price, 2),
+            'high': round(high_price, 2),
+            'low': round(low_price, 2),
+            'change_percent': round(change_pct, 2),
+            'volume': volume,
+            'timestamp': datetime.utcnow().isoformat()
+        }
 
-                return {
-                    'symbol': symbol,
-                    'market': 'morocco',
-                    'price': round(current_price, 2),
-                    'open': round(open_price, 2),
-                    'high': round(high_price, 2),
-                    'low': round(low_price, 2),
-                    'change_percent': round(change_pct, 2),
-                    'volume': volume,
-                    'timestamp': datetime.utcnow().isoformat()
-                }
-        except ImportError:
-            print("BVCscrap not installed, using fallback data")
-            return self._get_morocco_fallback(symbol)
-        except Exception as e:
-            print(f"BVCscrap error for {symbol}: {e}")
+    def get_provider_prices(self, provider, symbols):
+        """Get prices for many symbols with one batch call to a provider"""
+        quotes = {}
+        if not symbols:
+            return quotes
+
+        breaker = self.breakers[provider.name]
+        if breaker.allow():
+            started = time.monotonic()
+            try:
+                quotes = provider.get_quotes(symbols, lambda s: self.resolve_symbol(s)[1])
+                elapsed_ms = (time.monotonic() - started) * 1000
+                if quotes:
+                    breaker.record_success(elapsed_ms)
+                else:
+                    breaker.record_failure(elapsed_ms, trip=False)
+            except Exception as e:
+                breaker.record_failure((time.monotonic() - started) * 1000)
+                print(f"{provider.name} batch error for {symbols}: {e}")
+
+        # Same behaviour as the single-symbol path when upstream has nothing
+        for symbol in symbols:
+            if symbol not in quotes:
+                fallback = self._get_fallback(symbol, self.resolve_symbol(symbol)[1], provider)
+                if fallback:
+                    quotes[symbol] = fallback
+
+        return quotes
+
+    def _get_fallback(self, symbol, market, provider):
+        """Fallback quote when upstream fails (none for offline providers)"""
+        if not provider.allow_fallback:
+            return None
+        if market == 'morocco':
             return self._get_morocco_fallback(symbol)
-
-        return None
+        return self._get_fallback_price(symbol, market)
 
     def _get_fallback_price(self, symbol, market):
         """Fallback data for US/Crypto when yfinance fails"""
@@ -193,76 +447,226 @@ class MarketDataService:
             'is_fallback': True
         }
 
-    def refresh_all_prices(self):
-        """Refresh prices for all tracked symbols"""
-        updated = 0
+    def fetch_all_prices(self, symbols=None):
+        """
+        Fetch quotes for all tracked symbols concurrently.
+
+        Providers with a batch API (yfinance: US and crypto tickers in one
+        multi-ticker download) get one call each, while the others (BVCscrap
+        for Morocco) are fetched one symbol per thread on a bounded pool.
+        Each source has its own timeout; symbols from a source that times
+        out are left out so the cached row keeps its last value.
+        """
+        if symbols is None:
+            symbols = self.tracked_symbols()
+
+        batches = {}
+        single = []
+        for symbol in symbols:
+            provider = self.providers[self.resolve_symbol(symbol)[1]]
+            if provider.supports_batch:
+                batches.setdefault(provider, []).append(symbol)
+            else:
+                single.append(symbol)
+
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=SYMBOL_FETCH_MAX_WORKERS + len(batches))
+        try:
+            batch_futures = {
+                executor.submit(self.get_provider_prices, provider, provider_symbols): provider
+                for provider, provider_symbols in batches.items()
+            }
+            symbol_futures = {
+                executor.submit(self._fetch_price, symbol): symbol
+                for symbol in single
+            }
+
+            quotes = {}
+
+            done, not_done = wait(batch_futures, timeout=BATCH_FETCH_TIMEOUT)
+            for future in done:
+                quotes.update(future.result())
+            for future in not_done:
+                print(f"{batch_futures[future].name} batch timed out after {BATCH_FETCH_TIMEOUT}s")
+
+            # All sources started together, so measure from the same clock
+            remaining = max(0, SYMBOL_FETCH_TIMEOUT - (time.monotonic() - started))
+            done, not_done = wait(symbol_futures, timeout=remaining)
+            for future in done:
+                price_data = future.result()
+                if price_data:
+                    quotes[symbol_futures[future]] = price_data
+            if not_done:
+                missing = sorted(symbol_futures[f] for f in not_done)
+                print(f"Price fetch timed out after {SYMBOL_FETCH_TIMEOUT}s for {missing}")
+        finally:
+            # Don't hold the caller hostage to a hung upstream call
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return quotes
+
+    def tracked_symbols(self):
+        """Symbols the platform always lists (US, crypto, Morocco)"""
+        return US_SYMBOLS + CRYPTO_SYMBOLS + list(MOROCCO_SYMBOLS.keys())
+
+    def refresh_all_prices(self, batch=True, commit=True, symbols=None):
+        """
+        Refresh prices for all tracked symbols, or only `symbols`.
+
+        All rows are written with one bulk upsert. Pass commit=False to
+        leave the transaction open for the caller (e.g. to add the AI
+        signals of the same cycle before committing); the caller then runs
+        notify_prices() once it has committed.
+        """
+        all_symbols = symbols if symbols is not None else self.tracked_symbols()
+
+        # Closed markets whose row already holds the last close need nothing
+        settled = self._settled_symbols(all_symbols)
+        all_symbols = [symbol for symbol in all_symbols if symbol not in settled]
+
+        if batch:
+            quotes = self.fetch_all_prices(all_symbols)
+        else:
+            quotes = {symbol: self._fetch_price(symbol) for symbol in all_symbols}
 
-        all_symbols = US_SYMBOLS + CRYPTO_SYMBOLS + list(MOROCCO_SYMBOLS.keys())
+        now = datetime.utcnow()
+        version = MarketData.next_version() if quotes else None
+        rows = []
+        # Real quotes only: listeners (order fills, risk engine) must never
+        # act on the made-up fallback prices served during an outage
+        ticks = {}
 
         for symbol in all_symbols:
-            price_data = self.get_price(symbol)
+            price_data = quotes.get(symbol)
 
             if price_data:
-                # Update database cache
-                cached = MarketData.query.filter_by(symbol=symbol).first()
-
-                if cached:
-                    cached.price = price_data['price']
-                    cached.open_price = price_data.get('open')
-                    cached.high_price = price_data.get('high')
-                    cached.low_price = price_data.get('low')
-                    cached.change_percent = price_data.get('change_percent')
-                    cached.volume = price_data.get('volume')
-                    cached.last_updated = datetime.utcnow()
-                else:
-                    cached = MarketData(
-                        symbol=symbol,
-                        market=price_data['market'],
-                        price=price_data['price'],
-                        open_price=price_data.get('open'),
-                        high_price=price_data.get('high'),
-                        low_price=price_data.get('low'),
-                        change_percent=price_data.get('change_percent'),
-                        volume=price_data.get('volume'),
-                        last_updated=datetime.utcnow()
-                    )
-                    db.session.add(cached)
-
-                updated += 1
-
-        db.session.commit()
-        return updated
-
-    def get_historical_data(self, symbol, period='1mo', interval='1d'):
-        """Get historical data for charts"""
+                # Write through to the in-process and shared caches
+                self._store_price(symbol, price_data)
+                if not price_data.get('is_fallback'):
+                    ticks[symbol] = float(price_data['price'])
+
+                rows.append({
+                    'symbol': symbol,
+                    'market': price_data['market'],
+                    'price': price_data['price'],
+                    'open_price': price_data.get('open'),
+                    'high_price': price_data.get('high'),
+                    'low_price': price_data.get('low'),
+                    'change_percent': price_data.get('change_percent'),
+                    'volume': price_data.get('volume'),
+                    'last_updated': now,
+                    'version': version
+                })
+
+        # Update database cache
+        upsert(
+            MarketData, rows,
+            conflict_columns=['symbol'],
+            update_columns=['price', 'open_price', 'high_price', 'low_price',
+                            'change_percent', 'volume', 'last_updated', 'version']
+        )
+
+        with self._refresh_lock:
+            self._unnotified.update(ticks)
+
+        if commit:
+            db.session.commit()
+            self.notify_prices()
+        return len(rows)
+
+    def on_prices(self, callback):
+        """Register `callback({symbol: price})` to run after each refresh"""
+        self.price_listeners.append(callback)
+
+    def notify_prices(self):
+        """Hand the prices of the refreshes committed so far to the listeners"""
+        with self._refresh_lock:
+            prices, self._unnotified = self._unnotified, {}
+
+        if not prices:
+            return
+        for callback in self.price_listeners:
+            try:
+                callback(prices)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Price listener error: {e}")
+
+    def _settled_symbols(self, symbols):
+        """Symbols of closed markets whose MarketData row is newer than the close"""
+        closed = {m for m in self.calendars if self.is_market_closed(m)}
+        if not closed:
+            return set()
+
+        rows = db.session.query(MarketData.symbol, MarketData.market, MarketData.last_updated).filter(
+            MarketData.symbol.in_(symbols),
+            MarketData.market.in_(closed)
+        )
+        return {
+            symbol for symbol, market, last_updated in rows
+            if self.has_closing_price(market, last_updated)
+        }
+
+    def get_historical_columns(self, symbol, period='1mo', interval='1d', refetch_after=None):
+        """
+        Get candles as a (6, n) array of time/open/high/low/close/volume.
+
+        Served from the local candle store. Upstream is only asked for the
+        bars after the last stored one (at most every few minutes, or every
+        `refetch_after` seconds), or for the whole period when the store does
+        not reach back far enough.
+        """
+        # Replayed markets have their own clock
+        provider = self.providers[self.resolve_symbol(symbol)[1]]
+        start = provider.now() - PERIOD_DAYS.get(period, 30) * 86400
+        now = time.time()
+        if refetch_after is None:
+            step = INTERVAL_SECONDS.get(interval, 86400)
+            refetch_after = max(HISTORY_MIN_REFETCH, min(step, HISTORY_MAX_REFETCH))
+
+        with self.history.lock(symbol, interval):
+            columns, meta = self.history.load(symbol, interval)
+
+            if columns is None or meta['coverage_start'] > start or columns[0, -1] < start:
+                fresh = self._download_history(symbol, period, interval)
+                if fresh is not None:
+                    self.history.write(symbol, interval, fresh, start)
+                    columns, meta = self.history.load(symbol, interval)
+            elif now - meta['fetched_at'] >= refetch_after:
+                newer = self._download_history(symbol, period, interval, since=columns[0, -1])
+                self.history.append(symbol, interval, newer)
+                columns, meta = self.history.load(symbol, interval)
+
+        if columns is None:
+            return None
+        return HistoryStore.slice_since(columns, start)
+
+    def _download_history(self, symbol, period, interval, since=None):
+        """Fetch candles from upstream, from `since` (epoch seconds) if given"""
+        provider = self.providers[self.resolve_symbol(symbol)[1]]
+        breaker = self.breakers[provider.name]
+        if not breaker.allow():
+            return None
+
+        started = time.monotonic()
         try:
-            if symbol in MOROCCO_SYMBOLS:
-                # Use BVCscrap for Morocco
-                from BVCscrap import LoadData
-                end = datetime.now()
-                start = end - timedelta(days=30 if period == '1mo' else 365)
-
-                data = LoadData(
-                    symbol,
-                    start.strftime('%Y-%m-%d'),
-                    end.strftime('%Y-%m-%d')
-                )
-
-                if data is not None and not data.empty:
-                    return data.reset_index().to_dict('records')
-            else:
-                # Use yfinance
-                ticker = yf.Ticker(symbol)
-                data = ticker.history(period=period, interval=interval)
-
-                if not data.empty:
-                    data = data.reset_index()
-                    data['Date'] = data['Date'].astype(str)
-                    return data.to_dict('records')
+            data = provider.get_history(symbol, period, interval, since=since)
+            elapsed_ms = (time.monotonic() - started) * 1000
+            columns = frame_to_columns(data)
+            if columns is not None:
+                breaker.record_success(elapsed_ms)
+                return columns
+            # Upstream answered but has no bars (unknown symbol, nothing new).
+            # No key: the breaker is shared with quotes for this symbol.
+            breaker.record_failure(elapsed_ms, trip=False)
+        except ImportError:
+            print(f"{provider.name} not installed, no historical data")
+            breaker.record_failure(0, trip=False)
         except Exception as e:
+            breaker.record_failure((time.monotonic() - started) * 1000)
             print(f"Historical data error for {symbol}: {e}")
 
-        return []
+        return None
 
     def get_all_available_symbols(self):
         """Get all available trading symbols"""
@@ -0,0 +1,122 @@
+"""
+Order Book
+Per-symbol, price-sorted books of pending limit / stop-loss / take-profit
+orders, checked against each batch of fresh prices
+"""
+
+import heapq
+import threading
+from models import PendingOrder, db
+
+# (side, order_type) -> which way the price has to cross the trigger
+TRIGGER_DIRECTIONS = {
+    ('buy', 'limit'): 'below',        # buy at or under the limit
+    ('sell', 'limit'): 'above',       # sell at or over the limit
+    ('sell', 'stop_loss'): 'below',   # cut a long position on the way down
+    ('sell', 'take_profit'): 'above'  # bank a long position on the way up
+}
+
+
+class OrderBook:
+    """
+    Two heaps per symbol: a min-heap of triggers hit when the price rises
+    to them and a max-heap of triggers hit when it falls to them. Checking
+    a tick only looks at the top of each heap, so untouched orders cost
+    nothing however many are resting.
+
+    Orders are placed on any gunicorn worker while the price refresh runs
+    on one, so sync() books every pending order in the table that is not
+    in the book yet. Cancelled orders are left in the heaps and dropped
+    when they trigger, since fills re-read the order's status from the DB.
+    Orders crossed() pops that are not filled after all (locked by another
+    run, or the fill rolled back) go back in through restore().
+    """
+
+    def __init__(self):
+        self._books = {}
+        self._booked = set()
+        self._lock = threading.Lock()
+        self._counters = {'triggered': 0}
+
+    def add(self, order):
+        direction = TRIGGER_DIRECTIONS[(order.side, order.order_type)]
+        price = float(order.trigger_price)
+        with self._lock:
+            if order.id in self._booked:
+                return
+            self._booked.add(order.id)
+            above, below = self._books.setdefault(order.symbol, ([], []))
+            if direction == 'above':
+                heapq.heappush(above, (price, order.id))
+            else:
+                heapq.heappush(below, (-price, order.id))
+
+    def sync(self):
+        """Book pending orders (placed on any worker) missing from the book"""
+        pending_ids = {
+            row[0] for row in db.session.query(PendingOrder.id).filter(
+                PendingOrder.status == 'pending'
+            )
+        }
+        with self._lock:
+            missing = pending_ids - self._booked
+        if not missing:
+            return 0
+
+        orders = PendingOrder.query.filter(
+            PendingOrder.id.in_(missing),
+            PendingOrder.status == 'pending'
+        ).all()
+
+        for order in orders:
+            self.add(order)
+        return len(orders)
+
+    def restore(self, order_ids):
+        """Book `order_ids` again if they are still pending"""
+        if not order_ids:
+            return 0
+
+        orders = PendingOrder.query.filter(
+            PendingOrder.id.in_(order_ids),
+            PendingOrder.status == 'pending'
+        ).all()
+
+        for order in orders:
+            self.add(order)
+        return len(orders)
+
+    def symbols(self):
+        with self._lock:
+            return [symbol for symbol, (above, below) in self._books.items() if above or below]
+
+    def crossed(self, prices):
+        """
+        Pop and return the ids of orders whose trigger `prices`
+        ({symbol: price}) reached.
+        """
+        order_ids = []
+        with self._lock:
+            for symbol, price in prices.items():
+                book = self._books.get(symbol)
+                if not book:
+                    continue
+                above, below = book
+                while above and above[0][0] <= price:
+                    order_ids.append(heapq.heappop(above)[1])
+                while below and -below[0][0] >= price:
+                    order_ids.append(heapq.heappop(below)[1])
+                if not above and not below:
+                    del self._books[symbol]
+            self._booked.difference_update(order_ids)
+            self._counters['triggered'] += len(order_ids)
+        return order_ids
+
+    def stats(self):
+        with self._lock:
+            return {
+                'symbols': len(self._books),
+                'resting': sum(len(a) + len(b) for a, b in self._books.values()),
+                'booked': len(self._booked),
+                **self._counters
+            }
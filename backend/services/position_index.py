@@ -0,0 +1,83 @@
+"""
+Position Index
+Reverse index from symbol to the challenges holding it, so a price tick only
+re-evaluates the challenges exposed to that symbol
+"""
+
+import threading
+from models import Position, UserChallenge, db
+
+
+class PositionIndex:
+    """
+    symbol -> {challenge_id}, maintained in memory.
+
+    Trades on this worker keep it current through add() / remove(). Trades
+    on other workers are picked up by sync(), which loads every open
+    position of an active challenge it has not indexed yet - not just ids
+    above the highest seen, since a lower id can commit after a higher one
+    on another worker. Entries for positions closed
+    elsewhere linger until the risk engine finds no matching row and
+    calls remove(); a stale entry only costs one extra check.
+    """
+
+    def __init__(self):
+        self._by_symbol = {}
+        self._synced_ids = set()
+        self._lock = threading.Lock()
+
+    def add(self, challenge_id, symbol):
+        with self._lock:
+            self._by_symbol.setdefault(symbol, set()).add(challenge_id)
+
+    def remove(self, challenge_id, symbol):
+        with self._lock:
+            holders = self._by_symbol.get(symbol)
+            if holders:
+                holders.discard(challenge_id)
+                if not holders:
+                    del self._by_symbol[symbol]
+
+    def sync(self):
+        """Index open positions (opened on any worker) missing from the index"""
+        open_ids = {
+            row[0] for row in db.session.query(Position.id).join(
+                UserChallenge, Position.challenge_id == UserChallenge.id
+            ).filter(UserChallenge.status == 'active')
+        }
+        with self._lock:
+            # Forget closed positions, so the set stays the size of the book
+            self._synced_ids &= open_ids
+            missing = open_ids - self._synced_ids
+        if not missing:
+            return 0
+
+        rows = db.session.query(Position.id, Position.challenge_id, Position.symbol).filter(
+            Position.id.in_(missing)
+        ).all()
+
+        with self._lock:
+            for position_id, challenge_id, symbol in rows:
+                self._by_symbol.setdefault(symbol, set()).add(challenge_id)
+                self._synced_ids.add(position_id)
+        return len(rows)
+
+    def holders(self, symbols):
+        """Challenges holding any of `symbols`"""
+        with self._lock:
+            found = set()
+            for symbol in symbols:
+                found.update(self._by_symbol.get(symbol, ()))
+            return found
+
+    def symbols(self):
+        with self._lock:
+            return set(self._by_symbol)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'symbols': len(self._by_symbol),
+                'entries': sum(len(h) for h in self._by_symbol.values()),
+                'synced': len(self._synced_ids)
+            }
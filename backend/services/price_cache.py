@@ -0,0 +1,156 @@
+"""
+Price Cache
+In-process LRU cache for price quotes with TTL and stale-while-revalidate,
+plus single-flight coalescing of concurrent fetches
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PriceCache:
+    """
+    Bounded LRU cache keyed by symbol.
+
+    Entries younger than `ttl` are fresh. Entries between `ttl` and
+    `max_stale` are still served but flagged stale so the caller can
+    refresh them in the background. Anything older counts as a miss.
+    """
+
+    FRESH = 'fresh'
+    STALE = 'stale'
+
+    def __init__(self, max_size=512, ttl=30, max_stale=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {
+            'hits': 0,
+            'misses': 0,
+            'stale': 0,
+            'evictions': 0
+        }
+
+    def get(self, key, max_stale=None):
+        """
+        Return (value, state) where state is 'fresh', 'stale' or None.
+        `max_stale` overrides the cache-wide limit for this lookup.
+        """
+        now = time.monotonic()
+        max_stale = self.max_stale if max_stale is None else max_stale
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters['misses'] += 1
+                return None, None
+
+            value, stored_at = entry
+            age = now - stored_at
+
+            if age > max_stale:
+                del self._entries[key]
+                self._counters['misses'] += 1
+                return None, None
+
+            self._entries.move_to_end(key)
+
+            if age > self.ttl:
+                self._counters['stale'] += 1
+                return value, self.STALE
+
+            self._counters['hits'] += 1
+            return value, self.FRESH
+
+    def set(self, key, value):
+        """Store a value and evict the least recently used entries"""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._counters['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters plus current size and hit ratio"""
+        with self._lock:
+            stats = dict(self._counters)
+            stats['size'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['misses'] + stats['stale']
+        stats['hit_ratio'] = round((stats['hits'] + stats['stale']) / lookups, 4) if lookups else 0
+        stats['ttl'] = self.ttl
+        stats['max_stale'] = self.max_stale
+        stats['max_size'] = self.max_size
+        return stats
+
+
+class _Call:
+    """An in-flight SingleFlight execution shared by its waiters"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block until it finishes and share its result (or exception).
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'calls': 0,
+            'executions': 0,
+            'coalesced': 0
+        }
+
+    def do(self, key, func):
+        with self._lock:
+            self._counters['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._counters['executions'] += 1
+            else:
+                self._counters['coalesced'] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        return stats
@@ -0,0 +1,372 @@
+"""
+Market Data Providers
+Pluggable upstream sources behind MarketDataService: yfinance, BVCscrap and
+a replay provider that streams recorded ticks from local files
+"""
+
+import bisect
+import csv
+import glob
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# yfinance, pandas and BVCscrap are imported inside the methods that use
+# them: they cost most of a worker's boot time and many processes (CLI
+# commands, workers that only serve cached rows) never fetch market data
+
+# Seconds to wait for a multi-ticker yfinance download
+YFINANCE_BATCH_TIMEOUT = 15
+
+# yfinance interval -> pandas resample rule (replay history)
+RESAMPLE_RULES = {
+    '1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '60m': '60min', '90m': '90min', '1h': '60min',
+    '1d': '1D', '5d': '5D', '1wk': '1W'
+}
+
+
+class MarketDataProvider:
+    """
+    Base class for an upstream market data source.
+
+    Providers only talk to their source: they raise on upstream errors and
+    return None when the source has no data. Caching, circuit breaking and
+    fallback prices stay in MarketDataService.
+    """
+
+    name = None
+    # True when get_quotes fetches many symbols in one upstream call
+    supports_batch = False
+    # False for offline sources, where a random fallback price would
+    # break deterministic runs
+    allow_fallback = True
+    # False when the source has its own clock (replay), so exchange hours
+    # must not stop it from being asked
+    follows_calendar = True
+    # True when quotes are read off the last bar of the local daily-bar
+    # store (see MarketDataService.get_provider_price) instead of get_quote
+    daily_bar_quotes = False
+
+    def get_quote(self, symbol, market):
+        """Return a price dict for one symbol"""
+        raise NotImplementedError
+
+    def get_quotes(self, symbols, market_of):
+        """Return {symbol: price dict} for the symbols the source knows"""
+        quotes = {}
+        for symbol in symbols:
+            quote = self.get_quote(symbol, market_of(symbol))
+            if quote:
+                quotes[symbol] = quote
+        return quotes
+
+    def get_history(self, symbol, period, interval, since=None):
+        """Return an OHLCV DataFrame, from `since` (epoch seconds) if given"""
+        raise NotImplementedError
+
+    def now(self):
+        """Current time as seen by the source (epoch seconds)"""
+        return time.time()
+
+
+def quote_from_bars(symbol, market, data):
+    """Build a price dict from an intraday OHLCV frame (Open/High/Low/Close/Volume)"""
+    if data is None:
+        return None
+
+    data = data.dropna(subset=['Close'])
+    if data.empty:
+        return None
+
+    current_price = float(data['Close'].iloc[-1])
+    open_price = float(data['Open'].iloc[0])
+    high_price = float(data['High'].max())
+    low_price = float(data['Low'].min())
+    volume = float(data['Volume'].sum())
+    change_pct = ((current_price - open_price) / open_price) * 100
+
+    return {
+        'symbol': symbol,
+        'market': market,
+        'price': round(current_price, 2 if market == 'us' else 8),
+        'open': round(open_price, 2),
+        'high': round(high_price, 2),
+        'low': round(low_price, 2),
+        'change_percent': round(change_pct, 2),
+        'volume': volume,
+        'timestamp': datetime.utcnow().isoformat()
+    }
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Yahoo Finance (US stocks & Crypto)"""
+
+    name = 'yfinance'
+    supports_batch = True
+
+    def get_quote(self, symbol, market):
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        data = ticker.history(period='1d', interval='1m')
+
+        if data.empty:
+            # Try with longer period
+            data = ticker.history(period='5d', interval='1d')
+
+        return quote_from_bars(symbol, market, data)
+
+    def get_quotes(self, symbols, market_of):
+        """
+        Multi-ticker download. Symbols without intraday bars (e.g. US stocks
+        on a weekend) are retried together with daily bars, so at most two
+        requests are made.
+        """
+        import yfinance as yf
+
+        quotes = {}
+        pending = list(symbols)
+
+        for period, interval in (('1d', '1m'), ('5d', '1d')):
+            data = yf.download(
+                pending,
+                period=period,
+                interval=interval,
+                group_by='ticker',
+                threads=True,
+                progress=False,
+                timeout=YFINANCE_BATCH_TIMEOUT
+            )
+
+            if data is None or data.empty:
+                continue
+
+            grouped = data.columns.nlevels > 1
+            for symbol in list(pending):
+                if grouped and symbol not in data.columns.get_level_values(0):
+                    continue
+                frame = data[symbol] if grouped else data
+                quote = quote_from_bars(symbol, market_of(symbol), frame)
+                if quote:
+                    quotes[symbol] = quote
+                    pending.remove(symbol)
+
+            if not pending:
+                break
+
+        return quotes
+
+    def get_history(self, symbol, period, interval, since=None):
+        import yfinance as yf
+
+        ticker = yf.Ticker(symbol)
+        if since is not None:
+            return ticker.history(
+                start=datetime.fromtimestamp(since, tz=timezone.utc),
+                interval=interval
+            )
+        return ticker.history(period=period, interval=interval)
+
+
+class BVCScrapProvider(MarketDataProvider):
+    """Casablanca Stock Exchange through BVCscrap (daily bars)"""
+
+    name = 'bvcscrap'
+    # The scrape only has daily bars and is slow: quotes are read off the
+    # cached bars and only the days after the last one stored are fetched,
+    # so there is no get_quote
+    daily_bar_quotes = True
+
+    def get_history(self, symbol, period, interval, since=None):
+        from BVCscrap import LoadData
+        from services.history_store import PERIOD_DAYS
+
+        end = datetime.now()
+        if since is not None:
+            start = datetime.utcfromtimestamp(since)
+        else:
+            start = end - timedelta(days=PERIOD_DAYS.get(period, 30))
+
+        return LoadData(
+            symbol,
+            start.strftime('%Y-%m-%d'),
+            end.strftime('%Y-%m-%d')
+        )
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    Streams recorded ticks from CSV files at a configurable speed.
+
+    Every `*.csv` file under `directory` is read; rows need `timestamp`
+    (epoch seconds or ISO-8601), `symbol` and `price` columns, `volume` is
+    optional. The replay clock starts at the first recorded tick and runs at
+    `speed` x wall-clock time (speed=0 freezes it; move it with advance()
+    or seek() for fully deterministic runs). With `loop`, the recording
+    restarts once the last tick has been played.
+    """
+
+    name = 'replay'
+    # Ticks are in memory, so the per-symbol get_quotes loop is a batch
+    supports_batch = True
+    allow_fallback = False
+    follows_calendar = False
+
+    def __init__(self, directory, speed=1.0, loop=True):
+        self.directory = directory
+        self.speed = float(speed)
+        self.loop = loop
+        self._lock = threading.Lock()
+        self._ticks = self._load(directory)
+
+        if not self._ticks:
+            raise ValueError(f'No recorded ticks found in {directory}')
+
+        self.start_time = min(t[0][0] for t in self._ticks.values())
+        self.end_time = max(t[0][-1] for t in self._ticks.values())
+        self._offset = 0.0
+        self._started_at = time.monotonic()
+
+    @staticmethod
+    def _parse_time(value):
+        try:
+            return float(value)
+        except ValueError:
+            import pandas as pd
+
+            timestamp = pd.Timestamp(value)
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.tz_localize('UTC')
+            return timestamp.timestamp()
+
+    def _load(self, directory):
+        rows = {}
+        for path in sorted(glob.glob(os.path.join(directory, '*.csv'))):
+            with open(path, newline='') as f:
+                for row in csv.DictReader(f):
+                    symbol = row['symbol'].strip().upper()
+                    rows.setdefault(symbol, []).append((
+                        self._parse_time(row['timestamp']),
+                        float(row['price']),
+                        float(row.get('volume') or 0)
+                    ))
+
+        ticks = {}
+        for symbol, symbol_rows in rows.items():
+            symbol_rows.sort()
+            ticks[symbol] = tuple(list(column) for column in zip(*symbol_rows))
+        return ticks
+
+    # ==================== Replay clock ====================
+
+    def now(self):
+        """Current replay time (epoch seconds in the recording)"""
+        with self._lock:
+            elapsed = (time.monotonic() - self._started_at) * self.speed + self._offset
+
+        span = self.end_time - self.start_time
+        if self.loop and span > 0:
+            elapsed %= span + 1
+        return self.start_time + min(elapsed, span)
+
+    def advance(self, seconds):
+        """Move the replay clock forward by `seconds` of recorded time"""
+        with self._lock:
+            self._offset += seconds
+
+    def seek(self, timestamp):
+        """Jump the replay clock to an absolute recorded timestamp"""
+        with self._lock:
+            self._offset = timestamp - self.start_time
+            self._started_at = time.monotonic()
+
+    # ==================== Provider API ====================
+
+    def _session(self, symbol, now):
+        """(times, prices, volumes) of the symbol's UTC day up to `now`"""
+        ticks = self._ticks.get(symbol)
+        if not ticks:
+            return None
+
+        times, prices, volumes = ticks
+        end = bisect.bisect_right(times, now)
+        if end == 0:
+            return None
+
+        day_start = now - now % 86400
+        start = bisect.bisect_left(times, day_start, 0, end)
+        if start == end:
+            # Nothing yet today: the session is the last recorded tick
+            start = end - 1
+        return times[start:end], prices[start:end], volumes[start:end]
+
+    def get_quote(self, symbol, market):
+        session = self._session(symbol, self.now())
+        if session is None:
+            return None
+
+        times, prices, volumes = session
+        current_price = prices[-1]
+        open_price = prices[0]
+        change_pct = ((current_price - open_price) / open_price) * 100 if open_price else 0
+
+        return {
+            'symbol': symbol,
+            'market': market,
+            'price': round(current_price, 2 if market != 'crypto' else 8),
+            'open': round(open_price, 2),
+            'high': round(max(prices), 2),
+            'low': round(min(prices), 2),
+            'change_percent': round(change_pct, 2),
+            'volume': sum(volumes),
+            'timestamp': datetime.utcfromtimestamp(times[-1]).isoformat(),
+            'is_replay': True
+        }
+
+    def get_history(self, symbol, period, interval, since=None):
+        import pandas as pd
+
+        ticks = self._ticks.get(symbol)
+        if not ticks:
+            return None
+
+        times, prices, volumes = ticks
+        end = bisect.bisect_right(times, self.now())
+        start = bisect.bisect_left(times, since, 0, end) if since is not None else 0
+        if start >= end:
+            return None
+
+        index = pd.to_datetime(times[start:end], unit='s', utc=True)
+        price = pd.Series(prices[start:end], index=index)
+        rule = RESAMPLE_RULES.get(interval, '1D')
+
+        bars = price.resample(rule).ohlc().rename(columns=str.capitalize)
+        bars['Volume'] = pd.Series(volumes[start:end], index=index).resample(rule).sum()
+        bars.index.name = 'Date'
+        return bars.dropna(subset=['Close'])
+
+
+def build_providers():
+    """
+    Map each market to its provider.
+
+    MARKET_DATA_PROVIDER=replay routes every market to a ReplayProvider
+    reading REPLAY_DIR at REPLAY_SPEED (default 1x); otherwise US and crypto
+    use yfinance and Morocco uses BVCscrap.
+    """
+    if os.environ.get('MARKET_DATA_PROVIDER', 'live').lower() == 'replay':
+        replay = ReplayProvider(
+            os.environ.get('REPLAY_DIR', 'replay'),
+            speed=float(os.environ.get('REPLAY_SPEED', 1)),
+            loop=os.environ.get('REPLAY_LOOP', 'true').lower() == 'true'
+        )
+        return {'us': replay, 'crypto': replay, 'morocco': replay}
+
+    yfinance_provider = YFinanceProvider()
+    return {
+        'us': yfinance_provider,
+        'crypto': yfinance_provider,
+        'morocco': BVCScrapProvider()
+    }
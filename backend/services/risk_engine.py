@@ -0,0 +1,256 @@
+"""
+Risk Engine
+Marks the challenges exposed to each price refresh to market and applies the
+challenge rules to them in vectorized passes
+"""
+
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import Float, bindparam, cast, select
+from models import UserChallenge, Position, db
+from services.equity_history import record_snapshots
+
+# Challenges evaluated (and committed) per pass, most at-risk first
+RISK_CHUNK_SIZE = 2000
+
+
+class RiskEngine:
+    """
+    Batch counterpart of ChallengeEngine.evaluate_rules.
+
+    evaluate_rules only runs when a user trades, so a crash would not fail
+    anyone until their next order. evaluate() looks up the challenges
+    holding the refreshed symbols in the position index, loads their open
+    positions into arrays (challenge index, symbol index, quantity, entry
+    price), joins them with the new prices and computes equity, daily and
+    total drawdown for all of them at once.
+
+    Challenges are taken in order of headroom - how much of their holdings'
+    value they could lose before the nearest limit, as of the previous
+    pass - and evaluated in chunks, each committed on its own, so the
+    accounts closest to a breach are settled first. A chunk's challenge
+    rows are locked before its positions are read: a trade changes the
+    balance and the positions in one transaction, so both are seen either
+    before or after it, never half-way. Only challenges whose
+    numbers or status moved are written back, with one executemany UPDATE
+    guarded by status = 'active' so a challenge a trade has just closed is
+    left alone.
+    """
+
+    def __init__(self, position_index, chunk_size=RISK_CHUNK_SIZE):
+        self.positions = position_index
+        self.chunk_size = chunk_size
+        self._headroom = {}
+        self._lock = threading.Lock()
+        self._last_run = {}
+
+    def evaluate(self, prices):
+        """Revalue the challenges holding any of `prices` ({symbol: price}); commits"""
+        started = time.perf_counter()
+
+        self.positions.sync()
+        exposed = self.positions.holders(prices)
+
+        # Unknown headroom (new exposure) counts as most at risk
+        with self._lock:
+            ordered = sorted(exposed, key=lambda challenge_id: self._headroom.get(challenge_id, 0.0))
+
+        # Marked first, so a challenge this pass closes keeps the closing marks
+        self._mark_positions(prices, self.positions.symbols())
+        db.session.commit()
+
+        totals = {'challenges': 0, 'positions': 0, 'updated': 0, 'failed': 0, 'passed': 0}
+        for i in range(0, len(ordered), self.chunk_size):
+            result = self._evaluate_chunk(ordered[i:i + self.chunk_size], prices)
+            for key in totals:
+                totals[key] += result[key]
+
+        return self._record(started, len(exposed), totals)
+
+    def _evaluate_chunk(self, challenge_ids, prices):
+        import numpy as np
+
+        challenges = UserChallenge.__table__
+        rows = db.session.execute(
+            select(
+                challenges.c.id,
+                challenges.c.plan_type,
+                *self._floats(challenges, 'initial_balance', 'current_balance',
+                              'equity', 'daily_high_equity')
+            ).where(
+                challenges.c.id.in_(challenge_ids),
+                challenges.c.status == 'active'
+            ).order_by(challenges.c.id).with_for_update()
+        ).all()
+
+        positions = Position.__table__
+        held = db.session.execute(
+            select(
+                positions.c.challenge_id,
+                positions.c.symbol,
+                *self._floats(positions, 'quantity', 'entry_price', 'current_price')
+            ).where(positions.c.challenge_id.in_([row.id for row in rows]))
+        ).all() if rows else []
+
+        self._prune(challenge_ids, {row.id for row in rows}, held, prices)
+
+        if not rows:
+            return {'challenges': 0, 'positions': 0, 'updated': 0, 'failed': 0, 'passed': 0}
+
+        # Column-wise arrays; NULLs become NaN
+        ids, plan_types, initial, balance, old_equity, old_high = zip(*rows)
+        ids = np.array(ids, dtype=np.int64)
+        initial = np.array(initial, dtype=float)
+        balance = np.array(balance, dtype=float)
+        old_equity = np.array(old_equity, dtype=float)
+        old_high = np.array(old_high, dtype=float)
+
+        rules = [UserChallenge.PLAN_CONFIG.get(plan_type, {}) for plan_type in plan_types]
+        daily_max_loss = np.array([r.get('daily_max_loss', 0.05) for r in rules])
+        total_max_loss = np.array([r.get('total_max_loss', 0.10) for r in rules])
+        profit_target = np.array([r.get('profit_target', 0.10) for r in rules])
+
+        # Position value per challenge: fresh price where this refresh has
+        # one, else the last marked price, else the entry price
+        position_value = np.zeros(len(ids))
+        if held:
+            challenge_ids_held, symbols, quantity, entry, marked = zip(*held)
+            challenge_index = np.searchsorted(ids, challenge_ids_held)
+            symbols, symbol_index = np.unique(symbols, return_inverse=True)
+            tick = np.array([prices.get(symbol, np.nan) for symbol in symbols], dtype=float)
+
+            quantity = np.array(quantity, dtype=float)
+            entry = np.array(entry, dtype=float)
+            price = tick[symbol_index]
+            price = np.where(np.isnan(price), np.array(marked, dtype=float), price)
+            price = np.where(np.isnan(price), entry, price)
+
+            position_value = np.bincount(challenge_index, weights=quantity * price, minlength=len(ids))
+
+        equity = np.round(balance + position_value, 2)
+        high = np.fmax(np.where(np.isnan(old_high), initial, old_high), equity)
+
+        daily_drawdown = (high - equity) / initial
+        total_drawdown = (initial - equity) / initial
+        total_profit = (equity - initial) / initial
+
+        failed = (daily_drawdown >= daily_max_loss) | (total_drawdown >= total_max_loss)
+        passed = ~failed & (total_profit >= profit_target)
+        changed = failed | passed | (equity != old_equity) | (high != old_high)
+
+        # Loss to the nearest limit, as a share of the holdings at risk
+        floor = np.maximum(high - daily_max_loss * initial, initial * (1 - total_max_loss))
+        headroom = (equity - floor) / np.maximum(position_value, 1.0)
+        with self._lock:
+            for challenge_id, room, done in zip(ids.tolist(), headroom.tolist(), (failed | passed).tolist()):
+                if done:
+                    self._headroom.pop(challenge_id, None)
+                else:
+                    self._headroom[challenge_id] = room
+
+        now = datetime.utcnow()
+        updates = [
+            {
+                'b_id': int(ids[i]),
+                'b_equity': float(equity[i]),
+                'b_high': float(high[i]),
+                'b_total_pnl': float(equity[i] - initial[i]),
+                'b_status': 'failed' if failed[i] else 'passed' if passed[i] else 'active',
+                'b_end_date': now if failed[i] or passed[i] else None
+            }
+            for i in np.flatnonzero(changed)
+        ]
+
+        if updates:
+            db.session.execute(
+                challenges.update().where(
+                    challenges.c.id == bindparam('b_id'),
+                    challenges.c.status == 'active'
+                ).values(
+                    equity=bindparam('b_equity'),
+                    daily_high_equity=bindparam('b_high'),
+                    total_pnl=bindparam('b_total_pnl'),
+                    status=bindparam('b_status'),
+                    end_date=bindparam('b_end_date')
+                ),
+                updates
+            )
+
+        # Equity curve point for every challenge whose equity moved
+        moved = np.flatnonzero(equity != old_equity)
+        record_snapshots(list(zip(ids[moved].tolist(), equity[moved].tolist())), at=now)
+        db.session.commit()
+
+        return {
+            'challenges': len(ids),
+            'positions': len(held),
+            'updated': len(updates),
+            'failed': int(failed.sum()),
+            'passed': int(passed.sum())
+        }
+
+    def _prune(self, challenge_ids, active_ids, held, prices):
+        """Drop index entries for closed challenges and positions closed elsewhere"""
+        chunk = set(challenge_ids)
+        # Only positions of active challenges were loaded
+        still_held = {(row.challenge_id, row.symbol) for row in held}
+        for symbol in prices:
+            for challenge_id in self.positions.holders([symbol]) & chunk:
+                if (challenge_id, symbol) not in still_held:
+                    self.positions.remove(challenge_id, symbol)
+
+        with self._lock:
+            for challenge_id in chunk - active_ids:
+                self._headroom.pop(challenge_id, None)
+
+    @staticmethod
+    def _floats(table, *names):
+        """Numeric columns cast to float in SQL, so rows skip Decimal conversion"""
+        return [cast(table.c[name], Float).label(name) for name in names]
+
+    def _mark_positions(self, prices, held):
+        """
+        Set current price / unrealized P&L of held symbols in active
+        challenges, one statement per symbol; closed challenges keep the
+        marks they were closed at.
+        """
+        rows = [
+            {'b_symbol': symbol, 'b_price': float(prices[symbol])}
+            for symbol in held if symbol in prices
+        ]
+        if not rows:
+            return
+
+        table = Position.__table__
+        challenges = UserChallenge.__table__
+        price = bindparam('b_price')
+        active = select(challenges.c.id).where(challenges.c.status == 'active')
+        db.session.execute(
+            table.update().where(
+                table.c.symbol == bindparam('b_symbol'),
+                table.c.challenge_id.in_(active)
+            ).values(
+                current_price=price,
+                unrealized_pnl=(price - table.c.entry_price) * table.c.quantity
+            ),
+            rows
+        )
+
+    def _record(self, started, exposed, totals):
+        run = {
+            'ran_at': datetime.utcnow().isoformat(),
+            'ms': round((time.perf_counter() - started) * 1000, 1),
+            'exposed': exposed,
+            **totals
+        }
+        with self._lock:
+            self._last_run = run
+        return run
+
+    def stats(self):
+        with self._lock:
+            return {
+                'last_run': dict(self._last_run),
+                'index': self.positions.stats()
+            }
@@ -0,0 +1,243 @@
+"""
+Background Scheduler
+Runs market data refresh, AI signal regeneration, equity snapshot
+compaction and the daily reset as periodic APScheduler jobs, with a DB lease so only one worker runs each job
+"""
+
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from models import ScheduledJob, db
+
+
+class JobScheduler:
+    """
+    Periodic job runner shared by every gunicorn worker.
+
+    Each worker runs its own APScheduler, but before a job body executes the
+    worker must win a lease on the job's `scheduled_jobs` row with a single
+    conditional UPDATE. The lease lasts for most of the job's period, so a
+    run happens once per period no matter how many workers are up.
+
+    A run that outlasts its lease would let another worker start the same
+    job, so a heartbeat thread renews the lease while the body runs. When it
+    finishes the renewals are given back: the lease ends where it would
+    have without them, or right away if the run overran it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+        self.scheduler = BackgroundScheduler(timezone='UTC', job_defaults={
+            'coalesce': True,
+            'max_instances': 1
+        })
+        self.jobs = {}
+
+    def add_job(self, name, func, trigger, lease_seconds, run_now=False):
+        """Register a job body, run under an app context and the DB lease"""
+        self.jobs[name] = lease_seconds
+        options = {'next_run_time': datetime.now(timezone.utc)} if run_now else {}
+        self.scheduler.add_job(
+            self._run,
+            trigger=trigger,
+            args=[name, func, lease_seconds],
+            id=name,
+            name=name,
+            replace_existing=True,
+            **options
+        )
+
+    def start(self):
+        with self.app.app_context():
+            for name in self.jobs:
+                self._ensure_row(name)
+        self.scheduler.start()
+        print(f"Scheduler started in {self.owner}: {', '.join(self.jobs)}")
+
+    def shutdown(self):
+        self.scheduler.shutdown(wait=False)
+
+    # ==================== DB lease ====================
+
+    def _ensure_row(self, name):
+        if ScheduledJob.query.filter_by(name=name).first():
+            return
+        try:
+            db.session.add(ScheduledJob(name=name, run_count=0, error_count=0, total_duration_ms=0))
+            db.session.commit()
+        except IntegrityError:
+            # Another worker created it first
+            db.session.rollback()
+
+    def _acquire(self, name, lease_seconds):
+        """Take the job's lease if it has expired. Returns its end if we won, else None."""
+        now = datetime.utcnow()
+        locked_until = now + timedelta(seconds=lease_seconds)
+        result = db.session.execute(
+            update(ScheduledJob)
+            .where(
+                ScheduledJob.name == name,
+                or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until <= now)
+            )
+            .values(
+                locked_by=self.owner,
+                locked_until=locked_until,
+                last_started_at=now
+            )
+        )
+        db.session.commit()
+        return locked_until if result.rowcount == 1 else None
+
+    def _extend(self, name, locked_until):
+        """Move the end of our lease on `name`; False if another worker holds it"""
+        result = db.session.execute(
+            update(ScheduledJob)
+            .where(ScheduledJob.name == name, ScheduledJob.locked_by == self.owner)
+            .values(locked_until=locked_until)
+        )
+        db.session.commit()
+        return result.rowcount == 1
+
+    def _heartbeat(self, name, lease_seconds, done):
+        """Renew the lease every third of it until `done` is set"""
+        with self.app.app_context():
+            while not done.wait(lease_seconds / 3):
+                try:
+                    self._extend(name, datetime.utcnow() + timedelta(seconds=lease_seconds))
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Scheduler could not renew {name}: {e}")
+
+    def _record(self, name, duration_ms, error=None):
+        db.session.rollback()
+        job = ScheduledJob.query.filter_by(name=name).first()
+        job.last_finished_at = datetime.utcnow()
+        job.last_duration_ms = duration_ms
+        job.last_status = 'error' if error else 'success'
+        job.last_error = error
+        job.run_count = (job.run_count or 0) + 1
+        job.total_duration_ms = (job.total_duration_ms or 0) + duration_ms
+        if error:
+            job.error_count = (job.error_count or 0) + 1
+        db.session.commit()
+
+    def _run(self, name, func, lease_seconds):
+        with self.app.app_context():
+            try:
+                lease_until = self._acquire(name, lease_seconds)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Scheduler could not acquire {name}: {e}")
+                return
+            if lease_until is None:
+                return
+
+            done = threading.Event()
+            heartbeat = threading.Thread(
+                target=self._heartbeat, args=(name, lease_seconds, done),
+                name=f'lease-{name}', daemon=True
+            )
+            heartbeat.start()
+
+            started = time.monotonic()
+            error = None
+            try:
+                func()
+            except Exception as e:
+                error = str(e)
+                print(f"Scheduled job {name} failed: {e}")
+            finally:
+                done.set()
+                heartbeat.join()
+                # Give back the renewals, keeping this period's lease
+                try:
+                    db.session.rollback()
+                    self._extend(name, lease_until)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Scheduler could not release {name}: {e}")
+
+            duration_ms = int((time.monotonic() - started) * 1000)
+            try:
+                self._record(name, duration_ms, error)
+            except Exception as e:
+                db.session.rollback()
+                print(f"Scheduler could not record {name}: {e}")
+
+
+def _refresh_prices():
+    from flask import current_app
+    from routes.trading import market_service, demand_tracker
+
+    # Hot symbols every tick, idle ones every PRICE_IDLE_REFRESH_SECONDS
+    symbols = demand_tracker.due_symbols(
+        market_service.tracked_symbols(),
+        hot_interval=current_app.config['PRICE_REFRESH_SECONDS'],
+        idle_interval=current_app.config['PRICE_IDLE_REFRESH_SECONDS']
+    )
+    if symbols:
+        market_service.refresh_all_prices(symbols=symbols)
+
+
+def _generate_signals():
+    from routes.trading import ai_signal_service
+    ai_signal_service.generate_all_signals()
+
+
+def _compact_equity_snapshots():
+    from services.equity_history import compact_snapshots
+    compact_snapshots()
+
+
+def _reset_daily_metrics():
+    from routes.trading import challenge_engine
+    report = challenge_engine.reset_daily_metrics()
+    print(f"Daily reset for {report['trading_day']}: {report['rows']} challenges "
+          f"in {report['batches']} batches, {report['ms']} ms")
+
+
+def start_scheduler(app):
+    """Create and start the background scheduler with the configured cadences"""
+    price_seconds = app.config['PRICE_REFRESH_SECONDS']
+    signal_seconds = app.config['SIGNAL_REFRESH_SECONDS']
+
+    scheduler = JobScheduler(app)
+    # Lease slightly shorter than the period so the next tick can take over
+    scheduler.add_job(
+        'refresh_prices', _refresh_prices,
+        IntervalTrigger(seconds=price_seconds),
+        lease_seconds=price_seconds * 0.9,
+        run_now=True
+    )
+    scheduler.add_job(
+        'generate_signals', _generate_signals,
+        IntervalTrigger(seconds=signal_seconds),
+        lease_seconds=signal_seconds * 0.9,
+        run_now=True
+    )
+    compact_seconds = app.config['EQUITY_COMPACT_SECONDS']
+    scheduler.add_job(
+        'compact_equity_snapshots', _compact_equity_snapshots,
+        IntervalTrigger(seconds=compact_seconds),
+        lease_seconds=compact_seconds * 0.9
+    )
+    # At DAILY_RESET_HOUR UTC, or DAILY_RESET_MARKET's close in its timezone
+    from routes.trading import challenge_engine
+    reset_hour, reset_minute, reset_tz = challenge_engine.reset_time()
+    scheduler.add_job(
+        'reset_daily_metrics', _reset_daily_metrics,
+        CronTrigger(hour=reset_hour, minute=reset_minute, timezone=reset_tz),
+        lease_seconds=3600
+    )
+    scheduler.start()
+
+    app.extensions['job_scheduler'] = scheduler
+    return scheduler
@@ -0,0 +1,193 @@
+"""
+Shared Price Table
+mmap-backed, fixed-layout price table shared by every worker on a node
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows - no flock, table stays disabled
+    fcntl = None
+
+
+MAGIC = b'TSPT'
+LAYOUT_VERSION = 1
+
+# magic, layout version, slot count, padding
+HEADER = struct.Struct('<4sII4x')
+# seq, symbol, market, price, open, high, low, change %, volume, updated_at
+SLOT = struct.Struct('<Q16s8s7d')
+SEQ = struct.Struct('<Q')
+
+# Give up on a slot whose writer died mid-update
+MAX_READ_RETRIES = 100
+
+
+class SharedPriceTable:
+    """
+    Open-addressed symbol -> quote table in a memory-mapped file.
+
+    Any worker may publish - the price refresh runs on whichever one holds
+    the scheduler lease - but writes are serialised by an exclusive flock on
+    `<path>.lock`, so there is one writer at a time. Each slot carries a
+    seqlock counter so readers never take a lock: the writer bumps the
+    counter to an odd value, writes the payload, then bumps it to the next
+    even value, and a reader retries if it saw an odd or changed counter.
+    """
+
+    def __init__(self, path, slots=1024):
+        self.path = path
+        self.slots = slots
+        self.size = HEADER.size + SLOT.size * slots
+        self._write_lock = threading.Lock()
+        self._counters = {'reads': 0, 'hits': 0, 'writes': 0, 'retries': 0}
+
+        # Kept open for the life of the process; the OS drops a held flock
+        # if the process dies mid-write
+        self._lock_fd = os.open(f'{path}.lock', os.O_RDWR | os.O_CREAT, 0o644)
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._mm = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+
+        magic, version, slots_on_disk = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            HEADER.pack_into(self._mm, 0, MAGIC, LAYOUT_VERSION, slots)
+        elif version != LAYOUT_VERSION or slots_on_disk != slots:
+            raise ValueError(
+                f'Shared price table {path} has layout v{version}/{slots_on_disk} slots, '
+                f'expected v{LAYOUT_VERSION}/{slots} slots'
+            )
+
+    @classmethod
+    def from_env(cls):
+        """Open the table at $SHARED_PRICE_TABLE, or return None if unset/unsupported"""
+        path = os.environ.get('SHARED_PRICE_TABLE')
+        if not path or fcntl is None:
+            return None
+
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Shared price table disabled: {e}")
+            return None
+
+    # ==================== Slot access ====================
+
+    def _offset(self, index):
+        return HEADER.size + index * SLOT.size
+
+    def _probe(self, key):
+        """Yield slot indexes in probe order for a symbol key"""
+        start = zlib.crc32(key) % self.slots
+        for i in range(self.slots):
+            yield (start + i) % self.slots
+
+    def _read_slot(self, index):
+        """Consistent snapshot of one slot (seqlock read), None if torn"""
+        offset = self._offset(index)
+        for _ in range(MAX_READ_RETRIES):
+            seq_before = SEQ.unpack_from(self._mm, offset)[0]
+            if seq_before % 2 == 0:
+                record = SLOT.unpack_from(self._mm, offset)
+                if SEQ.unpack_from(self._mm, offset)[0] == seq_before:
+                    return record
+            self._counters['retries'] += 1
+        return None
+
+    def get(self, symbol):
+        """Return (price_data, updated_at epoch) for a symbol, or (None, None)"""
+        key = symbol.upper().encode()[:16].ljust(16, b'\0')
+        self._counters['reads'] += 1
+
+        for index in self._probe(key):
+            record = self._read_slot(index)
+            if record is None:
+                break
+            slot_key = record[1]
+            if slot_key == key:
+                self._counters['hits'] += 1
+                return self._to_price_data(record), record[9]
+            if slot_key == b'\0' * 16:
+                break
+
+        return None, None
+
+    def put(self, price_data):
+        """Publish a quote (waits for any other process's write to finish)"""
+        key = price_data['symbol'].upper().encode()[:16].ljust(16, b'\0')
+        market = (price_data.get('market') or '').encode()[:8]
+
+        # flock is per open file, so threads of this process also need the
+        # in-process lock
+        with self._write_lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                return self._write(key, market, price_data)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def _write(self, key, market, price_data):
+        for index in self._probe(key):
+            offset = self._offset(index)
+            record = SLOT.unpack_from(self._mm, offset)
+            if record[1] not in (key, b'\0' * 16):
+                continue
+
+            # An odd counter was left by a writer that died mid-update
+            seq = record[0] + record[0] % 2
+            SEQ.pack_into(self._mm, offset, seq + 1)
+            SLOT.pack_into(
+                self._mm, offset,
+                seq + 1, key, market,
+                float(price_data['price']),
+                float(price_data.get('open') or 0),
+                float(price_data.get('high') or 0),
+                float(price_data.get('low') or 0),
+                float(price_data.get('change_percent') or 0),
+                float(price_data.get('volume') or 0),
+                time.time()
+            )
+            SEQ.pack_into(self._mm, offset, seq + 2)
+            self._counters['writes'] += 1
+            return True
+
+        print(f"Shared price table full, could not store {price_data['symbol']}")
+        return False
+
+    def _to_price_data(self, record):
+        _, symbol, market, price, open_, high, low, change_pct, volume, updated_at = record
+        return {
+            'symbol': symbol.rstrip(b'\0').decode(),
+            'market': market.rstrip(b'\0').decode(),
+            'price': price,
+            'open': open_,
+            'high': high,
+            'low': low,
+            'change_percent': change_pct,
+            'volume': volume,
+            'timestamp': datetime.utcfromtimestamp(updated_at).isoformat()
+        }
+
+    def stats(self):
+        used = sum(
+            1 for i in range(self.slots)
+            if self._mm[self._offset(i) + 8:self._offset(i) + 24] != b'\0' * 16
+        )
+        return {
+            'path': self.path,
+            'slots': self.slots,
+            'used': used,
+            **self._counters
+        }
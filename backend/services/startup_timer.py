@@ -0,0 +1,66 @@
+"""
+Startup Timer
+Measures each step of create_app (imports, blueprint registration, DB setup)
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+# Slow-to-import market data dependencies that should stay unloaded at boot
+HEAVY_MODULES = ('pandas', 'numpy', 'yfinance', 'BVCscrap')
+
+
+class StartupTimer:
+    """Collects (step, milliseconds, modules imported) for the boot report"""
+
+    def __init__(self, started=None):
+        # perf_counter() value the total is measured from (default: now)
+        self.started = started if started is not None else time.perf_counter()
+        self.steps = []
+        self._finished = None
+
+    def add(self, name, ms, modules=None):
+        self.steps.append({
+            'step': name,
+            'ms': round(ms, 1),
+            'modules_imported': modules
+        })
+
+    @contextmanager
+    def step(self, name):
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, len(sys.modules) - modules_before)
+
+    def finish(self):
+        """Freeze the total and loaded modules at the end of boot"""
+        self._finished = {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'heavy_modules_loaded': [m for m in HEAVY_MODULES if m in sys.modules]
+        }
+
+    def report(self):
+        # Before finish() the numbers are the boot so far
+        finished = self._finished or {
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'heavy_modules_loaded': [m for m in HEAVY_MODULES if m in sys.modules]
+        }
+        return {
+            'total_ms': finished['total_ms'],
+            'steps': self.steps,
+            'heavy_modules_loaded': finished['heavy_modules_loaded']
+        }
+
+    def format(self):
+        report = self.report()
+        lines = [f"Startup timing: {report['total_ms']} ms"]
+        for step in sorted(self.steps, key=lambda s: s['ms'], reverse=True):
+            modules = step['modules_imported']
+            suffix = f" ({modules} modules)" if modules else ''
+            lines.append(f"  {step['ms']:>8.1f} ms  {step['step']}{suffix}")
+        lines.append(f"  heavy modules loaded: {', '.join(report['heavy_modules_loaded']) or 'none'}")
+        return '\n'.join(lines)
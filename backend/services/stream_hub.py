@@ -0,0 +1,198 @@
+"""
+Stream Hub
+In-process fan-out of price ticks, AI signal changes and challenge equity
+updates to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import threading
+import time
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+class Subscription:
+    """One connected client: its topics and a bounded event queue"""
+
+    def __init__(self, topics):
+        self.topics = set(topics)
+        self.queue = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Slow consumer: drop the oldest event rather than block publishers
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            self.queue.put_nowait(event)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class StreamHub:
+    """
+    Topic-based fan-out hub.
+
+    Publishers call publish(topic, event, data); each subscriber of the topic
+    gets the event on its own queue. changed() remembers the last state
+    published per key, so the same update arriving from several paths (a
+    local trade, the DB pump) is sent once.
+
+    Every open stream holds a gunicorn thread, so subscribe() refuses new
+    clients once `limit` are connected to this worker; they poll instead.
+
+    The hub lives in one process. To pick up updates written by other
+    gunicorn workers, a pump thread runs a callback every few seconds while
+    anyone is subscribed - one DB read per worker, however many clients.
+    """
+
+    def __init__(self):
+        self._topics = {}
+        self._streams = 0
+        self._lock = threading.Lock()
+        self._last_state = {}
+        self._pump_thread = None
+        self._counters = {'published': 0, 'delivered': 0, 'suppressed': 0}
+
+    # ==================== Subscriptions ====================
+
+    def subscribe(self, topics, limit=None):
+        """New subscription, or None when `limit` streams are already open"""
+        subscription = Subscription(topics)
+        with self._lock:
+            if limit is not None and self._streams >= limit:
+                return None
+            self._streams += 1
+            for topic in subscription.topics:
+                self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._streams -= 1
+            for topic in subscription.topics:
+                subscribers = self._topics.get(topic)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._topics[topic]
+
+    def has_subscribers(self, topic=None):
+        with self._lock:
+            if topic is None:
+                return bool(self._topics)
+            return bool(self._topics.get(topic))
+
+    def topics_with_prefix(self, prefix):
+        with self._lock:
+            return [t for t in self._topics if t.startswith(prefix)]
+
+    # ==================== Publishing ====================
+
+    def publish(self, topic, event, data):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+            self._counters['published'] += 1
+            self._counters['delivered'] += len(subscribers)
+
+        if not subscribers:
+            return 0
+
+        message = (event, data)
+        for subscription in subscribers:
+            subscription.push(message)
+        return len(subscribers)
+
+    def changed(self, key, state):
+        """Record `state` for `key`; False if it equals the last one published"""
+        with self._lock:
+            if self._last_state.get(key) == state:
+                self._counters['suppressed'] += 1
+                return False
+            self._last_state[key] = state
+            return True
+
+    # ==================== Cross-worker pump ====================
+
+    def ensure_pump(self, app, callback, interval):
+        """Start (once) a thread running `callback` under an app context"""
+        with self._lock:
+            if self._pump_thread is not None:
+                return
+            self._pump_thread = threading.Thread(
+                target=self._pump, args=(app, callback, interval),
+                name='stream-pump', daemon=True
+            )
+        self._pump_thread.start()
+
+    def _pump(self, app, callback, interval):
+        while True:
+            time.sleep(interval)
+            if not self.has_subscribers():
+                continue
+            with app.app_context():
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Stream pump error: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'streams': self._streams,
+                'topics': {topic: len(subs) for topic, subs in self._topics.items()},
+                **self._counters
+            }
+
+
+def format_sse(event, data):
+    """Serialise one Server-Sent Event"""
+    return f'event: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+
+
+# Process-wide hub shared by the services and the /stream endpoint
+stream_hub = StreamHub()
+
+
+# ==================== Event helpers ====================
+
+def publish_price(price_data):
+    """Price tick on 'prices' and 'prices:<SYMBOL>' when the price moved"""
+    symbol = price_data['symbol']
+    if not stream_hub.changed(('price', symbol), float(price_data['price'])):
+        return
+
+    tick = {
+        'symbol': symbol,
+        'market': price_data.get('market'),
+        'price': float(price_data['price']),
+        'change_percent': price_data.get('change_percent'),
+        'timestamp': price_data.get('timestamp') or price_data.get('last_updated')
+    }
+    stream_hub.publish('prices', 'price', tick)
+    stream_hub.publish(f'prices:{symbol}', 'price', tick)
+
+
+def publish_signal(signal):
+    """AI signal (AISignal.to_dict shape) on 'signals' when its call changed"""
+    state = (signal['signal'], signal['confidence'])
+    if stream_hub.changed(('signal', signal['symbol']), state):
+        stream_hub.publish('signals', 'signal', signal)
+
+
+def publish_challenge(challenge):
+    """Equity / status of a UserChallenge on 'challenge:<id>' when they changed"""
+    state = (float(challenge.equity), challenge.status)
+    if stream_hub.changed(('challenge', challenge.id), state):
+        stream_hub.publish(f'challenge:{challenge.id}', 'challenge', challenge.to_dict())
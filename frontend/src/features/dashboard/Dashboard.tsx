@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react';
 import { Link } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
-import { useTradingStore } from '../../store/tradingStore';
+import { useTradingStore, type SignalUpdate } from '../../store/tradingStore';
 import TradingChart from './TradingChart';
 import api from '../../services/api';
 import {
@@ -44,6 +44,7 @@ export default function Dashboard() {
     fetchPositions,
     fetchActiveChallenge,
     executeTrade,
+    subscribeStream,
     setSelectedSymbol,
     setSelectedMarket,
     isLoading,
@@ -75,19 +76,33 @@ export default function Dashboard() {
     fetchPositions();
     fetchAISignals();
 
-    // Refresh prices every 30 seconds
-    const priceInterval = setInterval(() => {
-      fetchPrice(selectedSymbol);
-    }, 30000);
-
-    // Refresh signals every 2 minutes
-    const signalInterval = setInterval(() => {
-      fetchAISignals();
-    }, 120000);
+    // Prices, signals and challenge equity are pushed by the server;
+    // poll instead when it has no stream slot left
+    let pollers: ReturnType<typeof setInterval>[] = [];
+    const closeStream = subscribeStream(
+      (signal: SignalUpdate) => {
+        setAiSignals((current) =>
+          [signal, ...current.filter((s) => s.symbol !== signal.symbol)]
+            .sort((a, b) => b.confidence - a.confidence)
+            .slice(0, 6)
+        );
+      },
+      () => {
+        pollers = [
+          // Refresh prices and challenge equity every 30 seconds
+          setInterval(() => {
+            fetchPrices();
+            fetchActiveChallenge();
+          }, 30000),
+          // Refresh signals every 2 minutes
+          setInterval(fetchAISignals, 120000),
+        ];
+      }
+    );
 
     return () => {
-      clearInterval(priceInterval);
-      clearInterval(signalInterval);
+      closeStream();
+      pollers.forEach(clearInterval);
     };
   }, []);
 
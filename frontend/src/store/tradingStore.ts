@@ -1,5 +1,5 @@
 import { create } from 'zustand';
-import api from '../services/api';
+import api, { API_URL } from '../services/api';
 
 interface PriceData {
   symbol: string;
@@ -32,8 +32,18 @@ interface Challenge {
   profit_percent: number;
 }
 
+export interface SignalUpdate {
+  symbol: string;
+  market: string;
+  signal: string;
+  confidence: number;
+  reasoning: string;
+  generated_at: string;
+}
+
 interface TradingState {
   prices: Record<string, PriceData>;
+  pricesCursor: number | null;
   positions: Position[];
   activeChallenge: Challenge | null;
   selectedSymbol: string;
@@ -47,12 +57,17 @@ interface TradingState {
   fetchPositions: () => Promise<void>;
   fetchActiveChallenge: () => Promise<void>;
   executeTrade: (symbol: string, side: 'buy' | 'sell', quantity: number, market: string) => Promise<any>;
+  subscribeStream: (
+    onSignal?: (signal: SignalUpdate) => void,
+    onUnavailable?: () => void
+  ) => () => void;
   setSelectedSymbol: (symbol: string) => void;
   setSelectedMarket: (market: string) => void;
 }
 
 export const useTradingStore = create<TradingState>((set, get) => ({
   prices: {},
+  pricesCursor: null,
   positions: [],
   activeChallenge: null,
   selectedSymbol: 'BTC-USD',
@@ -62,12 +77,16 @@ export const useTradingStore = create<TradingState>((set, get) => ({
 
   fetchPrices: async () => {
     try {
-      const response = await api.get('/trading/market-data');
-      const pricesMap: Record<string, PriceData> = {};
+      // After the first load only ask for the rows changed since then
+      const cursor = get().pricesCursor;
+      const response = await api.get('/trading/market-data', {
+        params: cursor !== null ? { since: cursor } : undefined,
+      });
+      const pricesMap: Record<string, PriceData> = { ...get().prices };
       response.data.data.prices.forEach((p: PriceData) => {
         pricesMap[p.symbol] = p;
       });
-      set({ prices: pricesMap });
+      set({ prices: pricesMap, pricesCursor: response.data.data.cursor });
     } catch (error) {
       console.error('Failed to fetch prices:', error);
     }
@@ -134,6 +153,58 @@ export const useTradingStore = create<TradingState>((set, get) => ({
     }
   },
 
+  // Server-pushed price ticks, signal changes and challenge equity
+  // (replaces polling). Returns a function that closes the stream.
+  // onUnavailable runs if the server refuses the stream (no free slot).
+  subscribeStream: (onSignal?: (signal: SignalUpdate) => void, onUnavailable?: () => void) => {
+    const token = localStorage.getItem('token');
+    if (!token) {
+      return () => {};
+    }
+
+    // EventSource cannot send an Authorization header
+    const source = new EventSource(
+      `${API_URL}/trading/stream?topics=prices,signals,challenge&token=${encodeURIComponent(token)}`
+    );
+
+    source.addEventListener('price', (event) => {
+      const tick = JSON.parse((event as MessageEvent).data);
+      set((state) => ({
+        prices: {
+          ...state.prices,
+          [tick.symbol]: {
+            ...state.prices[tick.symbol],
+            symbol: tick.symbol,
+            market: tick.market,
+            price: tick.price,
+            change_percent: tick.change_percent ?? state.prices[tick.symbol]?.change_percent,
+            last_updated: tick.timestamp,
+          },
+        },
+      }));
+    });
+
+    source.addEventListener('challenge', (event) => {
+      set({ activeChallenge: JSON.parse((event as MessageEvent).data) });
+    });
+
+    if (onSignal) {
+      source.addEventListener('signal', (event) => {
+        onSignal(JSON.parse((event as MessageEvent).data));
+      });
+    }
+
+    // EventSource retries dropped connections by itself but gives up for
+    // good on an error response, such as the 503 of a full worker
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED) {
+        onUnavailable?.();
+      }
+    };
+
+    return () => source.close();
+  },
+
   setSelectedSymbol: (symbol: string) => set({ selectedSymbol: symbol }),
   setSelectedMarket: (market: string) => set({ selectedMarket: market }),
 }));